@@ -0,0 +1,90 @@
+import hashlib
+import os
+
+import pygame
+
+# Scaled images are cached as raw pixels, keyed by the source file's path,
+# modification time and size and by the target size, so later starts skip PNG
+# decoding and scaling without reading the source at all
+ASSET_CACHE_DIR = os.path.join(".cache", "assets")
+
+
+# Every orientation of a sprite with its mask, built once at load time.
+# Orientation is keyed by facing_right; the source image faces left.
+class SpriteVariants:
+    def __init__(self, image):
+        self.variants = {}
+        for facing_right in (False, True):
+            variant = pygame.transform.flip(image, facing_right, False)
+            self.variants[facing_right] = (variant, pygame.mask.from_surface(variant))
+
+    def get(self, facing_right):
+        return self.variants[facing_right]
+
+
+# Variants shared by everything that uses the same source image
+_sprite_variants = {}
+
+
+def get_sprite_variants(image):
+    variants = _sprite_variants.get(image)
+    if variants is None:
+        variants = SpriteVariants(image)
+        _sprite_variants[image] = variants
+    return variants
+
+
+# Flyweight tile sprites: one surface and mask per (kind, color, size),
+# shared by every Trash, Rock and Algae that looks the same.
+# "ellipse" is a round piece on a transparent tile, "block" a solid square.
+_tile_sprites = {}
+
+
+def get_tile_sprite(kind, color, size):
+    key = (kind, tuple(color), size)
+    sprite = _tile_sprites.get(key)
+    if sprite is None:
+        if kind == "ellipse":
+            image = pygame.Surface((size, size), pygame.SRCALPHA)
+            pygame.draw.ellipse(image, color, (0, 0, size, size))
+        elif kind == "block":
+            image = pygame.Surface((size, size))
+            image.fill(color)
+        else:
+            raise ValueError(f"Unknown tile sprite kind: {kind}")
+        sprite = (image, pygame.mask.from_surface(image))
+        _tile_sprites[key] = sprite
+    return sprite
+
+
+def _scaled_cache_path(path, size, alpha):
+    stat = os.stat(path)
+    source = f"{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}"
+    digest = hashlib.sha1(source.encode()).hexdigest()[:16]
+    mode = "RGBA" if alpha else "RGB"
+    name = f"{os.path.basename(path)}-{digest}-{size[0]}x{size[1]}.{mode.lower()}"
+    return os.path.join(ASSET_CACHE_DIR, name), mode
+
+
+# Loads an image scaled to `size` and converted for the display (convert_alpha
+# with alpha)
+def load_scaled_image(path, size, alpha=False):
+    size = (int(size[0]), int(size[1]))
+    cache_path, mode = _scaled_cache_path(path, size, alpha)
+    try:
+        with open(cache_path, "rb") as f:
+            data = f.read()
+        image = pygame.image.frombytes(data, size, mode)
+    except (OSError, ValueError):
+        image = pygame.transform.scale(pygame.image.load(path), size)
+        try:
+            os.makedirs(ASSET_CACHE_DIR, exist_ok=True)
+            tmp_path = cache_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(pygame.image.tobytes(image, mode))
+            os.replace(tmp_path, cache_path)
+        except OSError:
+            pass  # Read-only install: just scale on every start
+    if pygame.display.get_surface() is None:
+        return image  # No display surface to match (texture renderer)
+    return image.convert_alpha() if alpha else image.convert()
@@ -0,0 +1,132 @@
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+# Headless frame-time benchmark for the gameplay loop.
+# Runs the same per-frame work as GameplayScene (simulation step + rendering) under
+# SDL's dummy video driver, with both fish driven by a scripted key sequence
+# and all placement seeded, and writes p50/p95/p99 frame times per stage and
+# trash count to a JSON file that can be diffed between runs.
+#
+#   python bench.py --output bench_results.json
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+import main  # noqa: E402
+from constants import FPS, HEIGHT, ORANGE, TEAL, TILE_SIZE, WIDTH  # noqa: E402
+from metrics import percentile, scripted_keys  # noqa: E402
+from simulation import FixedTimestep, Game  # noqa: E402
+
+DEFAULT_TRASH_COUNTS = [10, 100, 500, 1000, 2500, 5000]
+DEFAULT_STAGES = [1, 2, 3]
+DEFAULT_FRAMES = 600
+WARMUP_FRAMES = 30
+
+
+def setup_game(stage, trash_count, seed):
+    random.seed(seed)
+    game = Game(main.red_fish, main.blue_fish, random)
+    # Walk through the real stage transitions so rocks and algae are placed as in play
+    while game.stage < stage:
+        game.next_stage()
+    game.pop_events()
+
+    # Extra trash beyond what the level placed; stress counts exceed the free cells,
+    # so these go at random spots and may overlap
+    rng = random.Random(seed)
+    for i in range(trash_count - len(game.level.trashes)):
+        topleft = (rng.randint(0, int(WIDTH - TILE_SIZE)),
+                   rng.randint(0, int(HEIGHT - TILE_SIZE)))
+        game.level.place_trash(ORANGE if i % 2 == 0 else TEAL, topleft)
+
+    game.countdown = 0
+    return game
+
+
+def run_scenario(stage, trash_count, frames, seed):
+    main.game = setup_game(stage, trash_count, seed)
+    main.renderer.invalidate()
+    sim_clock = FixedTimestep()
+    frame_time = 1 / FPS
+    keys = scripted_keys()
+    samples = []
+    stage_changes = 0
+
+    for frame in range(WARMUP_FRAMES + frames):
+        start = time.perf_counter()
+        pygame.event.pump()
+        for name, _ in main.advance_game(sim_clock, frame_time, next(keys)):
+            if name == "stage_complete":
+                stage_changes += 1
+                main.renderer.invalidate()
+        main.draw_game()
+        elapsed = time.perf_counter() - start
+        if frame >= WARMUP_FRAMES:
+            samples.append(elapsed * 1000)
+        if main.game.finished:
+            break
+
+    samples.sort()
+    return {
+        "stage": stage,
+        "trash": trash_count,
+        "frames": len(samples),
+        "mean_ms": round(statistics.fmean(samples), 4) if samples else 0.0,
+        "p50_ms": round(percentile(samples, 50), 4),
+        "p95_ms": round(percentile(samples, 95), 4),
+        "p99_ms": round(percentile(samples, 99), 4),
+        "max_ms": round(samples[-1], 4) if samples else 0.0,
+        "stage_changes": stage_changes,
+    }
+
+
+def parse_list(value):
+    return [int(v) for v in value.split(",") if v]
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Headless frame-time benchmark")
+    parser.add_argument("--stages", type=parse_list, default=DEFAULT_STAGES)
+    parser.add_argument("--trash-counts", type=parse_list, default=DEFAULT_TRASH_COUNTS)
+    parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args(argv)
+
+    results = []
+    for stage in args.stages:
+        for trash_count in args.trash_counts:
+            result = run_scenario(stage, trash_count, args.frames, args.seed)
+            results.append(result)
+            print(f"stage {stage} trash {trash_count:5d}: "
+                  f"p50 {result['p50_ms']:.3f} ms  p95 {result['p95_ms']:.3f} ms  "
+                  f"p99 {result['p99_ms']:.3f} ms")
+
+    report = {
+        "meta": {
+            "seed": args.seed,
+            "frames": args.frames,
+            "warmup_frames": WARMUP_FRAMES,
+            "python": sys.version.split()[0],
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "dirty_rects": main.DIRTY_RECT_RENDERING,
+            "display": type(main.display).__name__,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,15 @@
+# Constants shared by the game window and the simulation
+# Logical resolution: the simulation and all drawing use these coordinates,
+# whatever the size of the real display (see render_backend)
+WIDTH, HEIGHT = 1920 * 2 // 3, 1080 * 2 // 3
+FPS = 60
+TILE_SIZE = 40
+
+BLUE = (70, 130, 180)
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+ORANGE = (255, 165, 0)
+TEAL = (0, 128, 128)
+GREEN = (0, 255, 0)
+GRAY = (128, 128, 128)
+DARK_BLUE = (0, 0, 70)
@@ -0,0 +1,91 @@
+import pygame
+
+from profiler import profiler
+
+
+# Dirty-rectangle renderer for the playfield.
+# Each frame gets the full list of (key, image, rect) sprites in draw order.
+# The renderer remembers where every key was drawn last frame, clears and
+# redraws only the regions that changed, and presents them with
+# pygame.display.update(rects). Call invalidate() whenever something else has
+# drawn over the screen (menus, banners, pause overlay) to force one full redraw.
+# Regions are cleared to the background color, or to the static background
+# surface from set_background() (pre-composited rocks and algae).
+class DirtyRectRenderer:
+    def __init__(self, surface, background_color, enabled=True):
+        self.surface = surface
+        self.background_color = background_color
+        self.enabled = enabled
+        self.background = None
+        self.full_redraw = True
+        self.previous = {}
+        self.extra_dirty = []
+
+    def invalidate(self):
+        self.full_redraw = True
+
+    def set_background(self, background):
+        # A new static layer means everything under the sprites changed
+        if background is not self.background:
+            self.background = background
+            self.full_redraw = True
+
+    def _clear(self, region=None):
+        if self.background is None:
+            self.surface.fill(self.background_color, region)
+        elif region is None:
+            self.surface.blit(self.background, (0, 0))
+        else:
+            self.surface.blit(self.background, region, region)
+
+    def capture(self):
+        pass  # The display surface already holds the last frame
+
+    def mark_dirty(self, rect):
+        # Region whose contents changed without its sprite moving (e.g. a redrawn
+        # overlay)
+        self.extra_dirty.append(pygame.Rect(rect))
+
+    def _dirty_regions(self, current):
+        dirty = []
+        for key, (image, rect) in current.items():
+            old = self.previous.get(key)
+            if old is None:
+                dirty.append(rect)
+            elif old[0] is not image or old[1] != rect:
+                dirty.append(rect.union(old[1]))
+        for key, (_, rect) in self.previous.items():
+            if key not in current:
+                dirty.append(rect)
+        return dirty
+
+    def render(self, sprites):
+        current = {key: (image, pygame.Rect(rect)) for key, image, rect in sprites}
+
+        if self.full_redraw or not self.enabled:
+            self._clear()
+            for image, rect in current.values():
+                self.surface.blit(image, rect)
+            profiler.mark("draw")
+            pygame.display.flip()
+            self.full_redraw = False
+        else:
+            dirty = self._dirty_regions(current) + self.extra_dirty
+            if dirty:
+                drawn = list(current.values())
+                rects = [rect for _, rect in drawn]
+                for region in dirty:
+                    # Clip so sprites only repaint the cleared region and keep their
+                    # stacking order
+                    self.surface.set_clip(region)
+                    self._clear(region)
+                    for index in region.collidelistall(rects):
+                        image, rect = drawn[index]
+                        self.surface.blit(image, rect)
+                self.surface.set_clip(None)
+                profiler.mark("draw")
+                pygame.display.update(dirty)
+
+        profiler.mark("present")
+        self.extra_dirty = []
+        self.previous = current
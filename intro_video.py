@@ -0,0 +1,314 @@
+import contextlib
+import importlib
+import os
+import queue
+import struct
+import threading
+
+import numpy as np
+import pygame
+
+# moviepy (with imageio and the ffmpeg tooling) is slow to import and only needed
+# to decode the intro when there is no frame cache yet, so it is imported lazily
+
+# Number of decoded, scaled frames allowed to wait for display
+FRAME_QUEUE_SIZE = 8
+
+# Marks the end of the decoded stream in the frame queue
+END_OF_STREAM = object()
+
+# Temporary cache files being written. An intro replayed while the last one
+# is still finishing its cache plays without writing a second copy.
+_writing = set()
+_writing_lock = threading.Lock()
+
+# Pre-decoded frame cache: a fixed-size header followed by raw RGB frames
+# stored in surfarray (width, height, 3) order, ready for blit_array
+CACHE_DIR = ".cache"
+CACHE_MAGIC = b"OCVF"
+CACHE_VERSION = 1
+# magic, version, width, height, fps, frame count, source size, source mtime (ns)
+CACHE_HEADER = struct.Struct("<4sHIIdIQq")
+CACHE_HEADER_SIZE = 64
+
+
+def cache_path_for(video_path):
+    return os.path.join(CACHE_DIR, os.path.basename(video_path) + ".frames")
+
+
+def _source_key(video_path):
+    stat = os.stat(video_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+# Writes decoded frames to the cache while the video plays for the first time
+# (and after it, see FrameDecoder).
+# Frames go to a temporary file that only replaces the real cache when the
+# with block ends after finish(); on any other exit the temporary file is
+# closed and deleted, so an interrupted intro never leaves a broken cache.
+# When the cache can't be written (read-only install, full disk) the writer
+# gives up quietly and the intro is simply decoded again next time.
+class FrameCacheWriter:
+    def __init__(self, video_path, size, fps):
+        self.path = cache_path_for(video_path)
+        self.tmp_path = self.path + ".tmp"
+        self.size = size
+        self.fps = fps
+        self.source_key = _source_key(video_path)
+        self.count = 0
+        self.finished = False
+        self.file = None
+        self.claimed = False  # tmp_path is ours to write and delete
+
+    def __enter__(self):
+        with _writing_lock:
+            if self.tmp_path in _writing:
+                return self  # Another decoder is writing this cache
+            _writing.add(self.tmp_path)
+            self.claimed = True
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            self.file = open(self.tmp_path, "wb")
+            self.file.write(b"\0" * CACHE_HEADER_SIZE)
+        except OSError:
+            self.abandon()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def active(self):
+        return self.file is not None
+
+    def write(self, surface):
+        if self.file is None:
+            return
+        try:
+            self.file.write(pygame.surfarray.array3d(surface).tobytes())
+        except OSError:
+            self.abandon()
+            return
+        self.count += 1
+
+    def finish(self):
+        # Every frame is written: keep the cache when the writer is closed
+        self.finished = True
+
+    def abandon(self):
+        self.finished = False
+        self.close()
+
+    def close(self):
+        file, self.file = self.file, None
+        if not self.claimed:
+            return  # The temporary file, if any, is another writer's
+        try:
+            with contextlib.suppress(OSError):
+                if file is not None:
+                    with file:
+                        if self.finished:
+                            file.seek(0)
+                            file.write(CACHE_HEADER.pack(
+                                CACHE_MAGIC, CACHE_VERSION, self.size[0], self.size[1],
+                                self.fps, self.count, *self.source_key))
+                if self.finished:
+                    os.replace(self.tmp_path, self.path)
+        finally:
+            # Gone already when the cache was published
+            with contextlib.suppress(OSError):
+                os.remove(self.tmp_path)
+            with _writing_lock:
+                _writing.discard(self.tmp_path)
+            self.claimed = False
+
+
+# Producer thread for the intro video.
+# Decodes frames with moviepy, converts and scales them to the window size and
+# hands them over as (timestamp, surface) through a bounded queue, so memory
+# stays at FRAME_QUEUE_SIZE frames however far ahead the decoder gets.
+# With a cache writer attached, every decoded frame is also transcoded to disk,
+# and stop() only stops the playback: the thread goes on decoding as fast as
+# it can until the cache is complete, so a machine too slow to decode in real
+# time still gets the cache after the first intro.
+class FrameDecoder(threading.Thread):
+    def __init__(self, video_path, size, queue_size=FRAME_QUEUE_SIZE,
+                 write_cache=False):
+        super().__init__(daemon=True)
+        from moviepy import VideoFileClip
+        self.clip = VideoFileClip(video_path)
+        self.fps = self.clip.fps
+        self.duration = self.clip.duration
+        self.size = (int(size[0]), int(size[1]))
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.stopped = threading.Event()
+        self.video_path = video_path
+        self.write_cache = write_cache
+
+    def _put(self, item):
+        # Blocks while the queue is full, but gives up as soon as stop() is called
+        while not self.stopped.is_set():
+            try:
+                self.frames.put(item, timeout=0.05)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _cache_writer(self):
+        # Opened by the thread itself, so a decoder that never runs leaves no file
+        if not self.write_cache:
+            return contextlib.nullcontext()
+        return FrameCacheWriter(self.video_path, self.size, self.fps)
+
+    def run(self):
+        frames = self.clip.iter_frames(fps=self.fps, dtype="uint8")
+        try:
+            with self._cache_writer() as writer:
+                for index, frame in enumerate(frames):
+                    surface = pygame.surfarray.make_surface(frame.swapaxes(0, 1))
+                    surface = pygame.transform.scale(surface, self.size)
+                    if writer is not None:
+                        writer.write(surface)
+                    playing = self._put((index / self.fps, surface))
+                    if not playing and (writer is None or not writer.active):
+                        break
+                else:
+                    if writer is not None:
+                        writer.finish()
+        finally:
+            self._put(END_OF_STREAM)
+            self.clip.close()
+
+    def stop(self):
+        # Stops handing out frames; see the class comment for the cache
+        self.stopped.set()
+        # Unblock a producer waiting on a full queue
+        while True:
+            try:
+                self.frames.get_nowait()
+            except queue.Empty:
+                break
+        if self.is_alive() and not self.write_cache:
+            self.join(timeout=1)
+
+
+# Intro played straight from the decoder thread.
+# frame_at() returns the newest frame that is due and drops any that are late.
+class DecodedIntro:
+    def __init__(self, video_path, size, write_cache=True):
+        self.decoder = FrameDecoder(video_path, size, write_cache=write_cache)
+        self.duration = self.decoder.duration
+        self.pending = None
+        self.finished = False
+
+    def start(self):
+        self.decoder.start()
+        # Wait for the first frame so decoder start-up doesn't eat into the audio
+        self.pending = self.decoder.frames.get()
+        self.finished = self.pending is END_OF_STREAM
+
+    def frame_at(self, position):
+        due = None
+        while True:
+            if self.pending is None:
+                try:
+                    self.pending = self.decoder.frames.get_nowait()
+                except queue.Empty:
+                    break  # Decoder is behind; try again next tick
+            if self.pending is END_OF_STREAM or self.pending[0] > position:
+                break
+            due = self.pending
+            self.pending = None
+        self.finished = self.pending is END_OF_STREAM and due is None
+        return due[1] if due is not None else None
+
+    def close(self):
+        self.decoder.stop()
+
+
+# Intro played from the memory-mapped frame cache.
+# Every frame is copied with blit_array onto the same surface, so playback
+# neither decodes nor allocates.
+class CachedIntro:
+    def __init__(self, path, size, fps, frame_count):
+        width, height = size
+        self.fps = fps
+        self.frame_count = frame_count
+        self.duration = frame_count / fps
+        self.frames = np.memmap(path, dtype=np.uint8, mode="r",
+                                offset=CACHE_HEADER_SIZE,
+                                shape=(frame_count, width, height, 3))
+        self.surface = pygame.Surface(size)
+        self.shown = -1
+        self.finished = False
+
+    def start(self):
+        self.shown = -1
+        self.finished = self.frame_count == 0
+
+    def frame_at(self, position):
+        index = int(position * self.fps)
+        if index >= self.frame_count:
+            self.finished = True
+            return None
+        if index == self.shown:
+            return None
+        pygame.surfarray.blit_array(self.surface, self.frames[index])
+        self.shown = index
+        return self.surface
+
+    def close(self):
+        self.frames = None
+
+
+# Opens the cached frames for video_path at the given size, or None when the
+# cache is missing or was built for another source file or window size
+def open_frame_cache(video_path, size):
+    path = cache_path_for(video_path)
+    try:
+        with open(path, "rb") as f:
+            header = f.read(CACHE_HEADER.size)
+        (magic, version, width, height, fps, count,
+         source_size, source_mtime) = CACHE_HEADER.unpack(header)
+    except (OSError, struct.error):
+        return None
+
+    if magic != CACHE_MAGIC or version != CACHE_VERSION:
+        return None
+    if (width, height) != (int(size[0]), int(size[1])):
+        return None
+    if (source_size, source_mtime) != _source_key(video_path):
+        return None
+    if os.path.getsize(path) != CACHE_HEADER_SIZE + count * width * height * 3:
+        return None
+    return CachedIntro(path, (width, height), fps, count)
+
+
+# Cached playback when possible; otherwise decode live and build the cache on the way
+def open_intro(video_path, size):
+    cached = open_frame_cache(video_path, size)
+    if cached is not None:
+        return cached
+    return DecodedIntro(video_path, size)
+
+
+# Imports the decoder in the background (e.g. while the menu is shown) so the
+# first intro doesn't wait for it; nothing to do when the frames are cached
+def preload_decoder(video_path):
+    if os.path.exists(cache_path_for(video_path)):
+        return None
+    thread = threading.Thread(target=importlib.import_module, args=("moviepy",),
+                              daemon=True)
+    thread.start()
+    return thread
+
+
+# Seconds of audio played so far, or None when the mixer has no position to report
+def audio_position():
+    if not pygame.mixer.get_init():
+        return None
+    pos = pygame.mixer.music.get_pos()
+    if pos < 0:
+        return None
+    return pos / 1000.0
@@ -0,0 +1,38 @@
+import pygame
+
+
+# Off-screen cache of the static playfield layers (background, rocks, algae).
+# compose() takes the layers bottom to top as (version, draw) pairs, where
+# draw(surface) paints that layer's contents. A layer is rebuilt only when its
+# version changes, on top of a copy of the cached layer below it, so eating an
+# algae rebuilds the algae layer from the cached rock layer. Rebuilt layers
+# are new surfaces, which tells the renderer to redraw once.
+class LayerCache:
+    def __init__(self, size, background_color):
+        self.size = size
+        self.background_color = background_color
+        self.layers = []  # [(version, surface)] bottom to top
+
+    def compose(self, layers):
+        below = None
+        rebuilt = False
+        for i, (version, draw) in enumerate(layers):
+            cached = self.layers[i] if i < len(self.layers) else None
+            if rebuilt or cached is None or cached[0] != version:
+                surface = pygame.Surface(self.size)
+                if below is None:
+                    surface.fill(self.background_color)
+                else:
+                    surface.blit(below, (0, 0))
+                draw(surface)
+                cached = (version, surface)
+                if i < len(self.layers):
+                    self.layers[i] = cached
+                else:
+                    self.layers.append(cached)
+                rebuilt = True
+            below = cached[1]
+        return below
+
+    def clear(self):
+        self.layers = []
@@ -0,0 +1,140 @@
+import os
+import random
+import threading
+
+import level_gen
+from constants import ORANGE, TEAL
+
+# Level layouts as pure data: the grid cells a level's trash goes to, plus the
+# cells of the obstacles added when a stage starts, as topleft tuples.
+# Building one only touches its own cell lists (level_gen), so the next level
+# can be laid out on a worker thread while the current one is being played and
+# the level transition just swaps the finished layout in. Level packs
+# (level_packs.py) store whole games of these, built ahead of time.
+
+LEVELS_PER_STAGE = 3
+LAST_STAGE = 3
+# Obstacles added when a stage starts are rocks on stage 2 and algae on stage 3;
+# stages whose obstacles block the fish (rocks), algae only slow them down
+BLOCKING_STAGES = {2}
+
+# Per difficulty and stage: (trash pieces of each color per level, obstacles
+# added when the stage starts). "normal" is the classic game. A difficulty can
+# also be given as a mapping of the same shape, for custom counts (sim_runner.py).
+DIFFICULTIES = {
+    "easy": {1: (4, 0), 2: (4, 6), 3: (4, 3)},
+    "normal": {1: (5, 0), 2: (5, 10), 3: (5, 5)},
+    "hard": {1: (6, 0), 2: (6, 16), 3: (6, 8)},
+}
+DEFAULT_DIFFICULTY = "normal"
+DIFFICULTY_ENV = "OCEAN_DIFFICULTY"
+
+
+class LevelLayout:
+    __slots__ = ("stage", "level_num", "obstacles", "trash")
+
+    def __init__(self, stage, level_num, obstacles, trash):
+        self.stage = stage
+        self.level_num = level_num
+        self.obstacles = obstacles  # [topleft]
+        self.trash = trash  # [(color, topleft)]
+
+
+def next_level_key(stage, level_num):
+    # (stage, level) that follows, or None after the last level of the last stage
+    if level_num < LEVELS_PER_STAGE:
+        return stage, level_num + 1
+    if stage < LAST_STAGE:
+        return stage + 1, 1
+    return None
+
+
+def difficulty_from_env():
+    # The difficulty named by OCEAN_DIFFICULTY, "normal" when it is not set
+    difficulty = os.environ.get(DIFFICULTY_ENV) or DEFAULT_DIFFICULTY
+    if difficulty not in DIFFICULTIES:
+        names = ", ".join(DIFFICULTIES)
+        raise ValueError(f"{DIFFICULTY_ENV} must be one of {names}, not {difficulty!r}")
+    return difficulty
+
+
+def stage_counts(stage, difficulty=DEFAULT_DIFFICULTY):
+    # (trash colors of each level, obstacles added when the stage starts)
+    counts = DIFFICULTIES[difficulty] if isinstance(difficulty, str) else difficulty
+    per_color, obstacles = counts[stage]
+    return [ORANGE] * per_color + [TEAL] * per_color, obstacles
+
+
+def build_layout(stage, level_num, occupied, blocked, seed,
+                 difficulty=DEFAULT_DIFFICULTY):
+    # `occupied` holds the topleft of every obstacle that stays on the board,
+    # `blocked` the ones among them that fish cannot swim through (rocks).
+    # Obstacles and trash are each spread out evenly; rocks never wall off part
+    # of the board and trash only goes where a fish can collect it.
+    rng = random.Random(seed)
+    colors, obstacle_count = stage_counts(stage, difficulty)
+    taken = {level_gen.to_cell(topleft) for topleft in occupied}
+    rocks = [level_gen.to_cell(topleft) for topleft in blocked]
+
+    obstacles = []
+    if level_num == 1 and obstacle_count and stage in BLOCKING_STAGES:
+        free = [cell for cell in level_gen.all_cells() if cell not in taken]
+        obstacles = level_gen.spread_rocks(rng, free, obstacle_count, rocks)
+        rocks += obstacles
+        taken.update(obstacles)
+    if rocks:
+        taken.update(level_gen.dead_cells(rocks))
+    free = [cell for cell in level_gen.all_cells() if cell not in taken]
+    if level_num == 1 and obstacle_count and stage not in BLOCKING_STAGES:
+        obstacles = level_gen.spread_cells(rng, free, obstacle_count)
+        placed = set(obstacles)
+        free = [cell for cell in free if cell not in placed]
+
+    cells = level_gen.spread_cells(rng, free, len(colors))
+    # Cells come out in random order, so the colors are mixed across the board.
+    # A full board gives fewer cells than colors; the rest of the trash is dropped.
+    trash = [(color, level_gen.to_topleft(cell))
+             for color, cell in zip(colors, cells, strict=False)]
+    obstacles = [level_gen.to_topleft(cell) for cell in obstacles]
+    return LevelLayout(stage, level_num, obstacles, trash)
+
+
+# One layout being built; runs on its own daemon thread, or inline via run()
+class LayoutJob(threading.Thread):
+    def __init__(self, stage, level_num, occupied, blocked, seed, difficulty):
+        super().__init__(daemon=True)
+        self.key = (stage, level_num)
+        self.args = (stage, level_num, occupied, blocked, seed, difficulty)
+        self.layout = None
+
+    def run(self):
+        self.layout = build_layout(*self.args)
+
+
+# Builds the next level's layout ahead of time.
+# The seed is drawn from the game's rng when the job is scheduled, so a level
+# gets the same layout whether it was prefetched on a thread or built inline
+# (threaded=False, for headless runs).
+class LayoutPrefetcher:
+    def __init__(self, rng=random, threaded=True, difficulty=DEFAULT_DIFFICULTY):
+        self.rng = rng
+        self.threaded = threaded
+        self.difficulty = difficulty
+        self.job = None
+
+    def schedule(self, stage, level_num, occupied, blocked):
+        self.job = LayoutJob(stage, level_num, list(occupied), list(blocked),
+                             self.rng.getrandbits(64), self.difficulty)
+        if self.threaded:
+            self.job.start()
+
+    def take(self, stage, level_num):
+        # The layout for (stage, level_num), or None if something else was prefetched
+        job, self.job = self.job, None
+        if job is None or job.key != (stage, level_num):
+            return None
+        if self.threaded:
+            job.join()
+        else:
+            job.run()
+        return job.layout
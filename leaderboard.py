@@ -0,0 +1,105 @@
+import json
+import logging
+import math
+import sqlite3
+import time
+
+# Leaderboard backed by SQLite.
+# Every finished game is one indexed INSERT in its own transaction, top-k reads
+# walk the score index, and a crash can never leave a half-written file behind.
+# The old leaderboard.json is imported once, the first time the database is
+# opened.
+
+
+logger = logging.getLogger(__name__)
+
+SCORE_TABLE = (
+    "CREATE TABLE IF NOT EXISTS scores ("
+    "id INTEGER PRIMARY KEY, team TEXT NOT NULL, score REAL NOT NULL, "
+    "created REAL NOT NULL)"
+)
+# Ties keep insertion order, like the stable sort of the old JSON list
+SCORE_INDEX = "CREATE INDEX IF NOT EXISTS scores_by_score ON scores (score, id)"
+META_TABLE = (
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+)
+
+
+def _legacy_row(entry):
+    # (team, score, created) for one old JSON entry, or None if it is not usable
+    if not isinstance(entry, dict):
+        return None
+    try:
+        score = float(entry["score"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if not math.isfinite(score):
+        return None
+    return str(entry.get("team", "")), score, 0.0
+
+
+class Leaderboard:
+    def __init__(self, path, legacy_json=None):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute(SCORE_TABLE)
+            self.conn.execute(SCORE_INDEX)
+            self.conn.execute(META_TABLE)
+        if legacy_json is not None:
+            self.import_json(legacy_json)
+
+    def import_json(self, path):
+        # One-time import of a JSON list of {"team", "score"} entries; returns how
+        # many were added. Entries without a usable score are skipped.
+        if self._meta("json_imported") is not None:
+            return 0
+        try:
+            with open(path) as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            entries = []
+        except json.JSONDecodeError as e:
+            # Leave the file alone and don't mark it imported, so it can be
+            # repaired and picked up later
+            logger.warning("Leaderboard: not importing %s: %s", path, e)
+            return 0
+        if not isinstance(entries, list):
+            logger.warning("Leaderboard: not importing %s: expected a list, got %s",
+                           path, type(entries).__name__)
+            return 0
+
+        rows = [row for row in map(_legacy_row, entries) if row is not None]
+        if len(rows) < len(entries):
+            logger.warning("Leaderboard: skipped %d unusable entries in %s",
+                           len(entries) - len(rows), path)
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO scores (team, score, created) VALUES (?, ?, ?)", rows)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) "
+                "VALUES ('json_imported', ?)", (path,))
+        return len(rows)
+
+    def _meta(self, key):
+        row = self.conn.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def add(self, team, score):
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO scores (team, score, created) VALUES (?, ?, ?)",
+                (team, score, time.time()))
+
+    def top(self, k=5):
+        rows = self.conn.execute(
+            "SELECT team, score FROM scores ORDER BY score, id LIMIT ?", (k,))
+        return [{"team": team, "score": score} for team, score in rows]
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM scores").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
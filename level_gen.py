@@ -0,0 +1,159 @@
+import math
+from collections import deque
+
+from constants import HEIGHT, TILE_SIZE, WIDTH
+
+# Level generation on the tile grid: blue-noise spacing and reachability.
+#
+# spread_cells() picks cells by Poisson-disk dart throwing: candidates are
+# tried in random order and kept only when no kept cell is closer than the
+# disk radius, which shrinks until enough cells are found. Rocks, algae and
+# trash come out evenly spread instead of in the clumps and holes of uniform
+# sampling.
+#
+# A fish (60px) is wider than a tile (40px), so a one-tile gap between rocks
+# is a wall. Reachability is worked out on the lattice of fish positions at
+# half-tile steps; rocks sit on whole tiles, so every edge of the space a fish
+# can occupy lies on that lattice and the answer is exact. open_area() is the
+# set of fish positions, when they form one region (no pockets walled in by
+# rocks); a cell is collectable when a fish in that region can cover it whole.
+
+COLS = WIDTH // TILE_SIZE
+ROWS = HEIGHT // TILE_SIZE
+STEP = TILE_SIZE // 2
+FISH_STEPS = (TILE_SIZE + 20) // STEP  # Fish sprites are TILE_SIZE + 20 square
+TILE_STEPS = TILE_SIZE // STEP
+POSITION_COLS = (WIDTH - (TILE_SIZE + 20)) // STEP + 1
+POSITION_ROWS = (HEIGHT - (TILE_SIZE + 20)) // STEP + 1
+
+# Starting disk radius as a share of the densest (hexagonal) packing radius,
+# and how fast it shrinks when the board cannot fit enough cells
+RADIUS_FILL = 0.7
+RADIUS_SHRINK = 0.85
+# Rock sets sampled before giving up on the full count
+MAX_ROCK_TRIES = 20
+
+
+def to_cell(topleft):
+    return topleft[0] // TILE_SIZE, topleft[1] // TILE_SIZE
+
+
+def to_topleft(cell):
+    return cell[0] * TILE_SIZE, cell[1] * TILE_SIZE
+
+
+def all_cells():
+    return [(x, y) for y in range(ROWS) for x in range(COLS)]
+
+
+def disk_radius(area, count):
+    # In cells; hexagonal packing gives each of `count` disks sqrt(3)/2 r^2 of `area`
+    if count <= 0:
+        return 0.0
+    return RADIUS_FILL * math.sqrt(2 * area / (math.sqrt(3) * count))
+
+
+def spread_cells(rng, candidates, count, radius=None):
+    # Up to `count` of the candidate cells, at least `radius` cells apart where
+    # the board allows it
+    candidates = list(candidates)
+    rng.shuffle(candidates)
+    if radius is None:
+        radius = disk_radius(len(candidates), count)
+    chosen = []
+    while len(chosen) < count and candidates:
+        limit = radius * radius
+        rejected = []
+        for x, y in candidates:
+            if all((x - cx) ** 2 + (y - cy) ** 2 >= limit for cx, cy in chosen):
+                chosen.append((x, y))
+                if len(chosen) == count:
+                    break
+            else:
+                rejected.append((x, y))
+        candidates = rejected
+        radius *= RADIUS_SHRINK  # Below one cell every candidate fits
+    return chosen
+
+
+def _blocked_positions(rocks):
+    # Fish positions (as indexes into the lattice) that overlap one of the rock cells
+    blocked = bytearray(POSITION_COLS * POSITION_ROWS)
+    for cx, cy in rocks:
+        x0, y0 = cx * TILE_STEPS, cy * TILE_STEPS
+        rows = range(max(0, y0 - FISH_STEPS + 1), min(POSITION_ROWS, y0 + TILE_STEPS))
+        cols = range(max(0, x0 - FISH_STEPS + 1), min(POSITION_COLS, x0 + TILE_STEPS))
+        for py in rows:
+            row = py * POSITION_COLS
+            for px in cols:
+                blocked[row + px] = 1
+    return blocked
+
+
+def open_area(rocks):
+    # Lattice flags of where a fish can be, or None when the rocks wall off
+    # part of the board
+    blocked = _blocked_positions(rocks)
+    start = blocked.find(0)
+    if start < 0:
+        return None
+    reached = bytearray(len(blocked))
+    reached[start] = 1
+    count = 1
+    queue = deque([start])
+    while queue:
+        i = queue.popleft()
+        x = i % POSITION_COLS
+        neighbours = (
+            (i - 1, x > 0),
+            (i + 1, x < POSITION_COLS - 1),
+            (i - POSITION_COLS, i >= POSITION_COLS),
+            (i + POSITION_COLS, i + POSITION_COLS < len(blocked)),
+        )
+        for j, ok in neighbours:
+            if ok and not blocked[j] and not reached[j]:
+                reached[j] = 1
+                count += 1
+                queue.append(j)
+    if count != len(blocked) - sum(blocked):
+        return None
+    return reached
+
+
+def collectable(area, cell):
+    # Whether a fish somewhere in `area` covers the whole cell
+    cx, cy = cell
+    x0, y0 = cx * TILE_STEPS, cy * TILE_STEPS
+    rows = range(max(0, y0 + TILE_STEPS - FISH_STEPS), min(POSITION_ROWS, y0 + 1))
+    cols = range(max(0, x0 + TILE_STEPS - FISH_STEPS), min(POSITION_COLS, x0 + 1))
+    for py in rows:
+        for px in cols:
+            if area[py * POSITION_COLS + px]:
+                return True
+    return False
+
+
+def dead_cells(rocks):
+    # Free cells no fish can collect trash from; empty when the rocks leave
+    # pockets (see open_area)
+    area = open_area(rocks)
+    if area is None:
+        return []
+    rocks = set(rocks)
+    return [cell for cell in all_cells()
+            if cell not in rocks and not collectable(area, cell)]
+
+
+def spread_rocks(rng, candidates, count, rocks=()):
+    # Like spread_cells, but the new rocks together with `rocks` always leave
+    # one open area. Resamples a few times, then drops rocks from the last try
+    # until the board opens up.
+    chosen = []
+    for _ in range(MAX_ROCK_TRIES):
+        chosen = spread_cells(rng, candidates, count)
+        if open_area(list(rocks) + chosen) is not None:
+            return chosen
+    while chosen and open_area(list(rocks) + chosen) is None:
+        chosen.pop()
+    return chosen
+
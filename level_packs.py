@@ -0,0 +1,218 @@
+import argparse
+import hashlib
+import multiprocessing
+import os
+import random
+import struct
+import sys
+import time
+from array import array
+
+import layouts
+import level_gen
+from constants import ORANGE, TEAL, TILE_SIZE
+from layouts import LevelLayout, build_layout, next_level_key
+
+# Level packs: whole games of level layouts, generated ahead of time.
+# A pack holds many games; a Game picks one of them with its seeded rng and
+# plays its levels in order, so no layout work happens while playing. The
+# layouts are the same ones build_layout makes in the game (blue-noise
+# spacing, no walled-in areas, trash only where a fish can collect it), at a
+# chosen difficulty.
+#
+#   Build:  python level_packs.py levels/normal.ocl --games 1000 --difficulty normal
+#   Play:   OCEAN_LEVEL_PACK=levels/normal.ocl python main.py
+#
+# File layout (little-endian): a header, then one uint32 offset per game plus
+# an end offset, then a stream of uint16 values. A game is its levels in play
+# order; each level is its obstacle count, its trash count, the obstacle cells
+# and then the trash cells, with TEAL_FLAG set on teal trash. Cells are
+# indexes into the board grid, which the header records so a pack made for a
+# different board is refused. Loading a pack only reads the header and the
+# offsets; a game's values are read and decoded when it is picked.
+
+PACK_ENV = "OCEAN_LEVEL_PACK"
+PACK_MAGIC = b"OCLP"
+PACK_VERSION = 1
+# magic, version, tile size, board columns, board rows, levels per game, games
+PACK_HEADER = struct.Struct("<4sHHHHHI")
+TEAL_FLAG = 0x8000
+
+DEFAULT_GAMES = 1000
+
+
+def level_keys():
+    # (stage, level) of every level of a game, in play order
+    keys = []
+    key = (1, 1)
+    while key is not None:
+        keys.append(key)
+        key = next_level_key(*key)
+    return keys
+
+
+def _cell_index(topleft):
+    x, y = level_gen.to_cell(topleft)
+    return y * level_gen.COLS + x
+
+
+def _cell_topleft(index):
+    return level_gen.to_topleft((index % level_gen.COLS, index // level_gen.COLS))
+
+
+def generate_game(seed, difficulty=layouts.DEFAULT_DIFFICULTY):
+    # Every level of one game, laid out on top of the obstacles placed before it
+    rng = random.Random(seed)
+    occupied = []
+    blocked = []
+    game = []
+    for stage, level_num in level_keys():
+        layout = build_layout(stage, level_num, occupied, blocked,
+                              rng.getrandbits(64), difficulty)
+        occupied += layout.obstacles
+        if stage in layouts.BLOCKING_STAGES:
+            blocked += layout.obstacles
+        game.append(layout)
+    return game
+
+
+def encode_game(game):
+    values = []
+    for layout in game:
+        values.append(len(layout.obstacles))
+        values.append(len(layout.trash))
+        values.extend(_cell_index(topleft) for topleft in layout.obstacles)
+        for color, topleft in layout.trash:
+            values.append(_cell_index(topleft) | (TEAL_FLAG if color == TEAL else 0))
+    return values
+
+
+def write_pack(path, games):
+    offsets = array("I", [0])
+    cells = array("H")
+    for game in games:
+        cells.extend(encode_game(game))
+        offsets.append(len(cells))
+    if sys.byteorder == "big":
+        offsets.byteswap()
+        cells.byteswap()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(PACK_HEADER.pack(PACK_MAGIC, PACK_VERSION, TILE_SIZE,
+                                 level_gen.COLS, level_gen.ROWS,
+                                 len(level_keys()), len(games)))
+        f.write(offsets.tobytes())
+        f.write(cells.tobytes())
+
+
+class LevelPack:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            try:
+                header = PACK_HEADER.unpack(f.read(PACK_HEADER.size))
+            except struct.error as e:
+                raise ValueError(f"{path} is not a level pack") from e
+            magic, version, tile_size, cols, rows, levels, games = header
+            if magic != PACK_MAGIC or version != PACK_VERSION:
+                raise ValueError(f"{path} is not a version {PACK_VERSION} level pack")
+            board = (TILE_SIZE, level_gen.COLS, level_gen.ROWS)
+            if (tile_size, cols, rows) != board or levels != len(level_keys()):
+                raise ValueError(f"{path} was made for a different board "
+                                 "or level count")
+            if not games:
+                raise ValueError(f"{path} has no games")
+            self.offsets = array("I")
+            self.offsets.frombytes(f.read((games + 1) * self.offsets.itemsize))
+        if len(self.offsets) != games + 1:
+            raise ValueError(f"{path} is cut short")
+        if sys.byteorder == "big":
+            self.offsets.byteswap()
+        self.path = path
+        self.cells_start = PACK_HEADER.size + len(self.offsets) * self.offsets.itemsize
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _read_game(self, index):
+        # One game's values as stored (little-endian uint16)
+        start, end = self.offsets[index], self.offsets[index + 1]
+        with open(self.path, "rb") as f:
+            f.seek(self.cells_start + start * 2)
+            return f.read((end - start) * 2)
+
+    def game_id(self, index):
+        # Nonzero 64-bit hash of one game's levels, so a recording can tell
+        # whether it is replayed on the same layouts
+        digest = hashlib.blake2b(self._read_game(index), digest_size=8).digest()
+        return int.from_bytes(digest, "little") or 1
+
+    def layouts(self, index):
+        # {(stage, level): LevelLayout} for one game
+        cells = array("H")
+        cells.frombytes(self._read_game(index))
+        if sys.byteorder == "big":
+            cells.byteswap()
+        i = 0
+        result = {}
+        for stage, level_num in level_keys():
+            obstacle_count, trash_count = cells[i], cells[i + 1]
+            i += 2
+            obstacles = [_cell_topleft(value) for value in cells[i:i + obstacle_count]]
+            i += obstacle_count
+            trash = [(TEAL if value & TEAL_FLAG else ORANGE,
+                      _cell_topleft(value & ~TEAL_FLAG))
+                     for value in cells[i:i + trash_count]]
+            i += trash_count
+            result[(stage, level_num)] = LevelLayout(stage, level_num, obstacles, trash)
+        return result
+
+
+def open_level_pack(path=None):
+    # The pack named by OCEAN_LEVEL_PACK, or None to lay levels out while playing
+    path = path or os.environ.get(PACK_ENV)
+    if not path:
+        return None
+    return LevelPack(path)
+
+
+def _generate_task(task):
+    return generate_game(*task)
+
+
+def build_pack(path, games, difficulty=layouts.DEFAULT_DIFFICULTY, seed=0,
+               workers=None):
+    tasks = [(seed + i, difficulty) for i in range(games)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        results = [generate_game(*task) for task in tasks]
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            results = pool.map(_generate_task, tasks, max(1, games // (workers * 8)))
+    write_pack(path, results)
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute a level pack")
+    parser.add_argument("output")
+    parser.add_argument("--games", type=int, default=DEFAULT_GAMES)
+    parser.add_argument("--difficulty", choices=list(layouts.DIFFICULTIES),
+                        default=layouts.DEFAULT_DIFFICULTY)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    build_pack(args.output, args.games, args.difficulty, args.seed, args.workers)
+    wall = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pack = LevelPack(args.output)
+    load = time.perf_counter() - start
+    size = os.path.getsize(args.output)
+    print(f"{len(pack)} {args.difficulty} games built in {wall:.1f} s, {size} bytes, "
+          f"loads in {load * 1e6:.0f} us; written to {args.output}")
+
+
+if __name__ == "__main__":
+    main_cli()
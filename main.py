@@ -1,57 +1,88 @@
-import pygame
 import random
 import time
-import math
-import json
-from moviepy import VideoFileClip, AudioFileClip
 
-# Initialize pygame
-pygame.init()
+import pygame
+
+from assets import get_sprite_variants, load_scaled_image
+from constants import (
+    BLACK,
+    BLUE,
+    DARK_BLUE,
+    FPS,
+    GREEN,
+    HEIGHT,
+    ORANGE,
+    TEAL,
+    TILE_SIZE,
+    WHITE,
+    WIDTH,
+)
+from intro_video import audio_position, open_intro, preload_decoder
+from layers import LayerCache
+from layouts import difficulty_from_env
+from leaderboard import Leaderboard
+from level_packs import open_level_pack
+from profiler import profiler
+from render_backend import open_display
+from replay import new_seed, open_recorder
+from scenes import Banner, FadeOut, ResultsScreen, Scene, SceneManager
+from simulation import FixedTimestep, Game
+from text_cache import TextLabel, render_text
+
+# Initialize only what the menu needs; the mixer is started when the intro plays
+pygame.display.init()
+pygame.font.init()
 clock = pygame.time.Clock()
-# Constants
-WIDTH, HEIGHT = 1920 // 1.5, 1080 // 1.5
-FPS = 60
-TILE_SIZE = 40
-
-BLUE = (70, 130, 180)
-WHITE = (255, 255, 255)
-BLACK = (0, 0, 0)
-ORANGE = (255, 165, 0)
-TEAL = (0, 128, 128)
-GREEN = (0, 255, 0)
-GRAY = (128, 128, 128)
-DARK_BLUE = (0, 0, 70)
-
-data_file = "leaderboard.json"
-
-# Initialize screen
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Ocean Cleanup")
-
-# Load fish images with alpha channel
-red_fish = pygame.image.load("redfish.png").convert_alpha()
-blue_fish = pygame.image.load("bluefish.png").convert_alpha()
-red_fish = pygame.transform.scale(red_fish, (TILE_SIZE + 20, TILE_SIZE + 20))
-blue_fish = pygame.transform.scale(blue_fish, (TILE_SIZE + 20, TILE_SIZE + 20))
+
+INTRO_VIDEO = "We can’t let this happen!.mp4"
+
+data_file = "leaderboard.db"
+legacy_data_file = "leaderboard.json"  # Imported into data_file once
+
+# Initialize screen: the pygame display, or a texture renderer when OCEAN_RENDERER
+# asks for one
+display = open_display((WIDTH, HEIGHT), "Ocean Cleanup")
+screen = display.surface
+
+# Load fish images with alpha channel (scaled copies come from the asset cache)
+FISH_SIZE = (TILE_SIZE + 20, TILE_SIZE + 20)
+red_fish = load_scaled_image("redfish.png", FISH_SIZE, alpha=True)
+blue_fish = load_scaled_image("bluefish.png", FISH_SIZE, alpha=True)
+# Precomputed levels (OCEAN_LEVEL_PACK), or None to lay them out while playing
+level_pack = open_level_pack()
+difficulty = difficulty_from_env()  # OCEAN_DIFFICULTY; a level pack has its own
+# Build both orientations and masks up front so turning around is a lookup
+get_sprite_variants(red_fish)
+get_sprite_variants(blue_fish)
 
 # Button and screen constants
 BUTTON_WIDTH = 200
 BUTTON_HEIGHT = 50
 BUTTON_SPACING = 20
 
+# Redraw only changed regions of the playfield instead of filling and flipping the
+# whole window
+DIRTY_RECT_RENDERING = True
+
+# Longest an idle menu sleeps in pygame.event.wait before checking again (ms)
+IDLE_WAIT_MS = 500
+
 #for pause mechanism:
 PAUSE_OVERLAY_ALPHA = 10
 
+renderer = display.sprite_renderer(BLUE, enabled=DIRTY_RECT_RENDERING)
+# Playfield background with rocks, then algae, composited off-screen and reused
+# until they change
+static_layers = LayerCache((WIDTH, HEIGHT), BLUE)
+
 # Load background image
-background = pygame.image.load("background.png").convert()
-background = pygame.transform.scale(background, (WIDTH, HEIGHT))
+background = load_scaled_image("background.png", (WIDTH, HEIGHT))
 
 # Screen states
 class ScreenState:
     MAIN_MENU = "main_menu"
     CONTROLS = "controls"
     SETTINGS = "settings"
-    PAUSED = "paused"
 
 
 current_screen = ScreenState.MAIN_MENU
@@ -66,20 +97,29 @@ class Button:
         self.callback = callback
         self.color = (70, 130, 180)
         self.hover_color = (100, 150, 200)
+        self.hovered = False
 
     def draw(self, surface):
-        mouse_pos = pygame.mouse.get_pos()
-        current_color = self.hover_color if self.rect.collidepoint(mouse_pos) else self.color
+        # Mouse events arrive in logical coordinates already; the polled position
+        # has to be converted by the display
+        mouse_pos = display.mouse_pos()
+        hovered = self.rect.collidepoint(mouse_pos)
+        current_color = self.hover_color if hovered else self.color
         pygame.draw.rect(surface, current_color, self.rect, border_radius=10)
-        font = pygame.font.Font(None, 36)
-        text = font.render(self.text, True, WHITE)
+        text = render_text(self.text, 36, WHITE)
         text_rect = text.get_rect(center=self.rect.center)
         surface.blit(text, text_rect)
 
     def handle_event(self, event):
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            if self.rect.collidepoint(event.pos):
-                self.callback()
+        if event.type == pygame.MOUSEBUTTONDOWN and self.rect.collidepoint(event.pos):
+            self.callback()
+
+    def hover_changed(self, pos):
+        # True when the mouse moved onto or off the button, i.e. it needs a redraw
+        hovered = self.rect.collidepoint(pos)
+        changed = hovered != self.hovered
+        self.hovered = hovered
+        return changed
 
 
 # Screen functions
@@ -99,48 +139,43 @@ def return_to_main_menu():
 
 
 def start_game():
-    fade_out()
-    play_intro_video("We can’t let this happen!.mp4")
-    
+    # Fade out, play the intro, fade again, then hand over to gameplay
+    scenes.push(FadeOut(on_done=play_intro))
+
+
+def play_intro():
+    scenes.push(IntroScene(INTRO_VIDEO, on_done=fade_to_gameplay))
+
+
+def fade_to_gameplay():
+    scenes.push(FadeOut(on_done=begin_gameplay))
+
+
+def begin_gameplay():
     # Initialize game state
-    global game_started, countdown_start
-    game_started = False
-    countdown_start = time.time()
-    
-    # Start the main game loop
-    run_game()
+    game.restart_countdown()
+    scenes.push(GameplayScene())
 
 
-def draw_main_menu():
+def draw_main_menu(buttons):
     screen.blit(background, (0, 0))
 
     # Draw title
-    title_font = pygame.font.Font(None, 72)
-    title_text = title_font.render("Guardians of the Ocean", True, WHITE)
+    title_text = render_text("Guardians of the Ocean", 72, WHITE)
     title_rect = title_text.get_rect(center=(WIDTH // 2, HEIGHT // 4))
     screen.blit(title_text, title_rect)
 
-    # Calculate button positions
-    start_y = HEIGHT // 3
-    buttons = [
-        Button("Play", WIDTH // 2 - BUTTON_WIDTH // 2, start_y, start_game),
-        Button("Controls", WIDTH // 2 - BUTTON_WIDTH // 2, start_y + BUTTON_HEIGHT + BUTTON_SPACING, show_controls_screen),
-        Button("Settings", WIDTH // 2 - BUTTON_WIDTH // 2, start_y + 2 * (BUTTON_HEIGHT + BUTTON_SPACING), show_settings_screen)
-    ]
-
     for button in buttons:
         button.draw(screen)
 
 
-def draw_controls_screen():
+def draw_controls_screen(back_button):
     screen.fill(WHITE)
 
     # Back button
-    back_button = Button("Back", 20, 20, return_to_main_menu)
     back_button.draw(screen)
 
     # Controls text
-    font = pygame.font.Font(None, 36)
     controls = [
         "Red Fish Controls:",
         "WASD to move",
@@ -156,22 +191,19 @@ def draw_controls_screen():
 
     y = 100
     for line in controls:
-        text = font.render(line, True, BLACK)
+        text = render_text(line, 36, BLACK)
         screen.blit(text, (WIDTH // 4, y))
         y += 40
 
 
-def draw_settings_screen():
-    global music_enabled
+def draw_settings_screen(back_button):
     screen.fill(WHITE)
 
     # Back button
-    back_button = Button("Back", 20, 20, return_to_main_menu)
     back_button.draw(screen)
 
     # Settings content
-    font = pygame.font.Font(None, 36)
-    text = font.render("Music:", True, BLACK)
+    text = render_text("Music:", 36, BLACK)
     screen.blit(text, (WIDTH // 3, HEIGHT // 3))
 
     # Checkbox
@@ -184,626 +216,376 @@ def draw_settings_screen():
 def create_pause_buttons():
     return [
         Button("Resume", WIDTH//2 - BUTTON_WIDTH//2, HEIGHT//2 - 100, resume_game),
-        Button("Restart Game", WIDTH//2 - BUTTON_WIDTH//2, HEIGHT//2 - 20, restart_game),
-        Button("Main Menu", WIDTH//2 - BUTTON_WIDTH//2, HEIGHT//2 + 60, return_to_main_menu_from_pause)
+        Button("Restart Game", WIDTH//2 - BUTTON_WIDTH//2, HEIGHT//2 - 20,
+               restart_game),
+        Button("Main Menu", WIDTH//2 - BUTTON_WIDTH//2, HEIGHT//2 + 60,
+               return_to_main_menu_from_pause)
     ]
 
 def restart_game():
-    global current_screen, game_started, countdown_start
-    fade_out()
+    # Replaces the running game instead of starting a new one inside it
+    scenes.pop()  # Pause menu
+    scenes.push(FadeOut(on_done=restart_from_fade))
+
+def restart_from_fade():
     reset_game_state()
-    current_screen = ScreenState.MAIN_MENU
+    scenes.pop()  # Old gameplay
     start_game()  # This will trigger a new game with fade and countdown
 
 def resume_game():
-    global current_screen, game_started, countdown_start
-    current_screen = ScreenState.MAIN_MENU  # Exit pause state
-    game_started = False
-    countdown_start = time.time()  # Restart countdown
+    scenes.pop()  # Exit pause state
+    game.restart_countdown()
 
 def return_to_main_menu_from_pause():
-    global current_screen, running
+    global current_screen
     current_screen = ScreenState.MAIN_MENU
-    
-def reset_game_state():
-    global stage, level_num, level, player1, player2, rocks, algae_list, game_started
-    stage = 1
-    level_num = 1
-    rocks = []
-    algae_list = []
-    player1 = Player(100, HEIGHT-100, (255,0,0), ORANGE, red_fish)
-    player2 = Player(200, HEIGHT-100, (0,0,255), TEAL, blue_fish)
-    level = Level(stage, level_num)
-    game_started = False
-
-# Main menu loop
-def main_menu():
-    global current_screen, music_enabled
+    while not isinstance(scenes.top, MenuScene):
+        scenes.pop()
     reset_game_state()
-    # Create buttons outside the loop
-    main_menu_buttons = [
-        Button("Play", WIDTH // 2 - BUTTON_WIDTH // 2, HEIGHT // 3, start_game),
-        Button("Controls", WIDTH // 2 - BUTTON_WIDTH // 2, HEIGHT // 3 + BUTTON_HEIGHT + BUTTON_SPACING, show_controls_screen),
-        Button("Settings", WIDTH // 2 - BUTTON_WIDTH // 2, HEIGHT // 3 + 2 * (BUTTON_HEIGHT + BUTTON_SPACING), show_settings_screen)
-    ]
     
-    running = True
-    while running:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                exit()
-
-            # Handle button events based on current screen
-            if current_screen == ScreenState.MAIN_MENU:
-                for button in main_menu_buttons:
-                    button.handle_event(event)
-            elif current_screen == ScreenState.CONTROLS:
-                back_button = Button("Back", 20, 20, return_to_main_menu)
-                back_button.handle_event(event)
-            elif current_screen == ScreenState.SETTINGS:
-                back_button = Button("Back", 20, 20, return_to_main_menu)
-                back_button.handle_event(event)
-
-                # Handle checkbox click
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    checkbox_rect = pygame.Rect(WIDTH // 3 + 100, HEIGHT // 3, 30, 30)
-                    if checkbox_rect.collidepoint(event.pos):
-                        music_enabled = not music_enabled
+def reset_game_state():
+    global game
+    if game is not None and game.recorder is not None:
+        game.recorder.close()
+    # Seeded so the game can be recorded and replayed (OCEAN_RECORD, replay.py)
+    seed = new_seed()
+    game = Game(red_fish, blue_fish, rng=random.Random(seed), pack=level_pack,
+                difficulty=difficulty)
+    game.recorder = open_recorder(game, seed)
+
+
+def quit_game():
+    if game.recorder is not None:
+        game.recorder.close()
+    pygame.quit()
+    exit()
+
+
+# Main menu, with the Controls and Settings screens.
+# Nothing here animates, so the menu is an idle scene: it is only redrawn
+# after a click, a key press or the mouse moving onto or off a button.
+class MenuScene(Scene):
+    idle = True
+
+    def __init__(self):
+        super().__init__()
+        # Buttons are created once and reused for every frame and event
+        self.buttons = [
+            Button("Play", WIDTH // 2 - BUTTON_WIDTH // 2, HEIGHT // 3, start_game),
+            Button("Controls", WIDTH // 2 - BUTTON_WIDTH // 2,
+                   HEIGHT // 3 + BUTTON_HEIGHT + BUTTON_SPACING, show_controls_screen),
+            Button("Settings", WIDTH // 2 - BUTTON_WIDTH // 2,
+                   HEIGHT // 3 + 2 * (BUTTON_HEIGHT + BUTTON_SPACING),
+                   show_settings_screen)
+        ]
+        self.back_button = Button("Back", 20, 20, return_to_main_menu)
+        self.screen = None  # current_screen as last drawn
+
+    def visible_buttons(self):
+        if current_screen == ScreenState.MAIN_MENU:
+            return self.buttons
+        return [self.back_button]
+
+    def handle_event(self, event):
+        global music_enabled
+        if event.type in (pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN):
+            self.dirty = True
+        elif event.type == pygame.MOUSEMOTION:
+            for button in self.visible_buttons():
+                if button.hover_changed(event.pos):
+                    self.dirty = True
+
+        # Handle button events based on current screen
+        if current_screen == ScreenState.MAIN_MENU:
+            for button in self.buttons:
+                button.handle_event(event)
+        elif current_screen == ScreenState.CONTROLS:
+            self.back_button.handle_event(event)
+        elif current_screen == ScreenState.SETTINGS:
+            self.back_button.handle_event(event)
+
+            # Handle checkbox click
+            if event.type == pygame.MOUSEBUTTONDOWN:
+                checkbox_rect = pygame.Rect(WIDTH // 3 + 100, HEIGHT // 3, 30, 30)
+                if checkbox_rect.collidepoint(event.pos):
+                    music_enabled = not music_enabled
+
+    def draw(self, _surface):  # The draw_*_screen functions draw on screen
+        if current_screen != self.screen:
+            # Buttons shown again still have the hover state from when they were
+            # hidden; refresh it so the next mouse motion redraws correctly
+            self.screen = current_screen
+            mouse_pos = display.mouse_pos()
+            for button in self.visible_buttons():
+                button.hover_changed(mouse_pos)
 
         # Draw appropriate screen
         if current_screen == ScreenState.MAIN_MENU:
-            draw_main_menu()
+            draw_main_menu(self.buttons)
         elif current_screen == ScreenState.CONTROLS:
-            draw_controls_screen()
+            draw_controls_screen(self.back_button)
         elif current_screen == ScreenState.SETTINGS:
-            draw_settings_screen()
-
-        pygame.display.flip()
-        clock.tick(FPS)
-
-
-# Fade out function
-def fade_out():
-    fade = pygame.Surface((WIDTH, HEIGHT))
-    fade.fill(BLACK)
-    for alpha in range(0, 255, 5):
-        fade.set_alpha(alpha)
-        screen.blit(fade, (0, 0))
-        pygame.display.update()
-        pygame.time.delay(30)
-
-
-# Intro video function
-def play_intro_video(video_path):
-    # Initialize audio first
-    pygame.mixer.init()
-    pygame.mixer.music.load("audio.wav")
-
-    # Load video
-    clip = VideoFileClip(video_path)
-    video_fps = clip.fps
-    video_duration = clip.duration
-
-    # Start audio and video simultaneously
-    pygame.mixer.music.play()
-    start_time = time.time()
-
-    clock = pygame.time.Clock()
-
-    try:
-        for frame in clip.iter_frames(fps=video_fps, dtype="uint8"):
-            # Handle events
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    exit()
-
-            # Check if we've exceeded video duration
-            if time.time() - start_time > video_duration:
-                break
-
-            # Process frame
-            frame_surface = pygame.surfarray.make_surface(frame.swapaxes(0, 1))
-            frame_surface = pygame.transform.scale(frame_surface, (WIDTH, HEIGHT))
-            screen.blit(frame_surface, (0, 0))
-            pygame.display.update()
-
-            # Maintain video timing
-            clock.tick(video_fps)
-    finally:
-        clip.close()
-        pygame.mixer.music.stop()
-
-    fade_out()
-
-
-# Player class with sprite handling
-class Player:
-    def __init__(self, x, y, color, trash_color, image):
-        self.original_image = image
-        self.image = self.original_image
-        self.rect = self.image.get_rect(topleft=(x, y))
-        self.color = color
-        self.trash_color = trash_color
-        self.vel = 3
-        self.touching_wrong_trash = False
-        self.immobilized = False
-        self.immobilized_start_time = 0
-        self.facing_right = False
-        self.last_direction = "left"
-        self.mask = pygame.mask.from_surface(self.image)
-
-    def move(self, keys, up, down, left, right):
-        if self.immobilized:
-            if time.time() - self.immobilized_start_time >= 3:
-                self.immobilized = False
+            draw_settings_screen(self.back_button)
+
+
+# Intro video, synced to the audio track
+class IntroScene(Scene):
+    def __init__(self, video_path, on_done=None):
+        super().__init__(on_done)
+        self.video_path = video_path
+        self.intro = None
+        self.frame = None
+        self.start_time = 0
+
+    def update(self, _dt):  # Timed by the audio clock, not frame time
+        if self.intro is None:
+            # Initialize audio first
+            pygame.mixer.init()
+            pygame.mixer.music.load("audio.wav")
+
+            # Pre-decoded frames from the cache, or a decoder thread that builds
+            # the cache
+            self.intro = open_intro(self.video_path, (WIDTH, HEIGHT))
+            self.intro.start()
+
+            # Start audio and video simultaneously
+            pygame.mixer.music.play()
+            self.start_time = time.time()
+
+        # The audio track is the master clock; wall time only if the mixer can't tell
+        position = audio_position()
+        if position is None:
+            position = time.time() - self.start_time
+
+        # Check if we've exceeded video duration
+        if self.intro.finished or position > self.intro.duration:
+            self.intro.close()
+            pygame.mixer.music.stop()
+            self.finish()
             return
 
-        dx, dy = 0, 0
-        direction_changed = False
-        
-        # Horizontal movement takes priority for facing direction
-        if keys[left]:
-            dx -= 1
-            if self.last_direction != "left" or not keys[right]:
-                self.facing_right = False
-                direction_changed = True
-        if keys[right]:
-            dx += 1
-            if self.last_direction != "right" or not keys[left]:
-                self.facing_right = True
-                direction_changed = True
-        
-        # Vertical movement
-        if keys[up]: dy -= 1
-        if keys[down]: dy += 1
-
-        # Update image based on direction
-        if direction_changed:
-            self.image = pygame.transform.flip(self.original_image, self.facing_right, False)
-            self.mask = pygame.mask.from_surface(self.image)
-        
-        # Update last direction
-        if dx != 0:
-            self.last_direction = "right" if dx > 0 else "left"
-
-        if dx != 0 or dy != 0:
-            length = math.hypot(dx, dy)
-            dx, dy = dx/length, dy/length
-            new_x = self.rect.x + dx * self.vel
-            new_y = self.rect.y + dy * self.vel
-            
-            # Create temp rect for collision checking
-            temp_rect = self.image.get_rect(topleft=(new_x, new_y))
-            
-            # Keep within screen bounds
-            if temp_rect.left < 0: new_x = 0
-            if temp_rect.right > WIDTH: new_x = WIDTH - temp_rect.width
-            if temp_rect.top < 0: new_y = 0
-            if temp_rect.bottom > HEIGHT: new_y = HEIGHT - temp_rect.height
-            
-            # Check collisions with rocks
-            collision = False
-            for rock in rocks:
-                if temp_rect.colliderect(rock.rect):
-                    collision = True
-                    break
-            
-            if not collision:
-                self.rect.topleft = (new_x, new_y)
+        self.frame = self.intro.frame_at(position)
 
     def draw(self, surface):
-        surface.blit(self.image, self.rect)
-
-# Trash class with mask
-class Trash:
-    def __init__(self, color, existing_trashes):
-        self.image = pygame.Surface((TILE_SIZE, TILE_SIZE), pygame.SRCALPHA)
-        pygame.draw.ellipse(self.image, color, (0, 0, TILE_SIZE, TILE_SIZE))
-        self.rect = self.image.get_rect()
-        self.mask = pygame.mask.from_surface(self.image)
-        
-        while True:
-            print()
-            self.rect.topleft = (
-                random.randint(0, int(WIDTH - TILE_SIZE)),
-                random.randint(0, int(HEIGHT - TILE_SIZE))
-            )
-            collision = False
-            # Check against existing trash:
-            for t in existing_trashes:
-                if self.rect.colliderect(t.rect):
-                    collision = True
-                    break
-            # Check against players:
-            for p in [player1, player2]:
-                if self.rect.colliderect(p.rect):
-                    collision = True
-                    break
-            # Check against rocks:
-            for rock in rocks:
-                if self.rect.colliderect(rock.rect):
-                    collision = True
-                    break
-            # Check against algae:
-            for algae in algae_list:
-                if self.rect.colliderect(algae.rect):
-                    collision = True
-                    break
-            if not collision:
-                break
-        
-        self.color = color
-        self.collected = False
-        
-    def draw(self, surface):
-        if not self.collected:
-            surface.blit(self.image, self.rect)
-
+        if self.frame is not None:
+            surface.blit(self.frame, (0, 0))
+
+
+# Everything drawn on the playfield, in draw order, as (key, image, rect) for the
+# renderer
+# Rocks and algae are not sprites; they are part of the static background layer
+def playfield_sprites():
+    sprites = [(trash, trash.image, trash.rect) for trash in game.level.visible_trash()]
+    for player in game.players:
+        sprites.append((player, player.image, player.rect))
+    return sprites
+
+# One frame of gameplay: advances the simulation by frame_time seconds of
+# fixed steps and returns the events the presentation has to handle
+def advance_game(sim_clock, frame_time, keys):
+    sim_clock.advance(frame_time, lambda: game.step(keys))
+    return game.pop_events()
+
+def draw_rocks(surface):
+    for rock in game.rocks:
+        rock.draw(surface)
+
+def draw_algae(surface):
+    for algae in game.algae_list:
+        algae.draw(surface)
+
+# Draws the countdown or the playfield with the HUD
+def draw_game():
+    renderer.set_background(static_layers.compose([
+        (game.rock_map.version, draw_rocks),
+        (game.algae_map.version, draw_algae),
+    ]))
+
+    if not game.started:
+        # Draw countdown under the (static) game elements
+        text = render_text(str(game.countdown_display()), countdown_font_size, WHITE)
+        text_rect = text.get_rect(center=(WIDTH//2, HEIGHT//2))
+        renderer.render([("countdown", text, text_rect)] + playfield_sprites()
+                        + profiler_sprites())
+        return
+
+    # Draw UI elements
+    timer_text = timer_label.render(f"Time: {round(game.elapsed, 1)}s")
+    
+    # Collected counters are kept up to date by the level's trash store
+    level = game.level
+    orange_collected = level.collected_count(ORANGE)
+    teal_collected = level.collected_count(TEAL)
+    
+    level_text = level_label.render(
+        f"Stage: {game.stage}  Level: {game.level_num}  "
+        f"Orange: {orange_collected}/{level.required_orange}  "
+        f"Teal: {teal_collected}/{level.required_teal}")
+
+    renderer.render(playfield_sprites() + [
+        ("timer", timer_text, timer_text.get_rect(topleft=(WIDTH-200, 20))),
+        ("level", level_text, level_text.get_rect(topleft=(20, 20))),
+    ] + profiler_sprites())
+
+# Profiler overlay (toggled with F3), redrawn every frame while visible
+def profiler_sprites():
+    if not profiler.overlay_visible:
+        return []
+    overlay = profiler.overlay()
+    rect = overlay.get_rect(bottomright=(WIDTH - 10, HEIGHT - 10))
+    renderer.mark_dirty(rect)
+    return [("profiler", overlay, rect)]
+
+# Countdown and gameplay; pushes the pause menu, stage banners and the results
+# screen on top.
+# With a ReplayPlayer, the recorded keys drive the game instead of the keyboard.
+class GameplayScene(Scene):
+    self_presenting = True  # The dirty-rect renderer presents its own frames
+
+    def __init__(self, replay=None):
+        super().__init__()
+        # Gameplay advances in fixed SIM_DT steps; rendering just shows the latest state
+        self.sim_clock = FixedTimestep()
+        self.replay = replay
 
-# Rock class with mask
-class Rock:
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_SPACE and game.started and self.replay is None:
+                scenes.push(PauseScene())
+            elif event.key == pygame.K_F3:
+                profiler.toggle_overlay()
+                renderer.invalidate()
+
+    def update(self, dt):
+        if self.replay is None:
+            events = advance_game(self.sim_clock, dt, pygame.key.get_pressed())
+        else:
+            self.sim_clock.advance(dt, lambda: self.replay.step(game))
+            events = game.pop_events()
+            if self.replay.finished and not game.finished:
+                scenes.push(Banner("Replay finished", on_done=quit_game))
+
+        for name, payload in events:
+            if name == "stage_complete":
+                # The simulation is not advanced while the banner shows
+                scenes.push(Banner(payload))
+            elif name == "game_over" and self.replay is not None:
+                scenes.push(Banner(f"Replay finished. Time: {round(payload, 2)}s",
+                                   on_done=quit_game))
+            elif name == "game_over":
+                scenes.push(ResultsScreen(payload, save_score, on_done=quit_game))
+
+    def draw(self, _surface):  # The sprite renderer draws and presents
+        draw_game()
+
+
+# Pause menu, drawn over the frozen game frame
+class PauseScene(Scene):
     def __init__(self):
-        self.image = pygame.Surface((TILE_SIZE, TILE_SIZE))
-        self.image.fill(GRAY)
-        self.rect = self.image.get_rect()
-        self.mask = pygame.mask.from_surface(self.image)
-        
-        while True:
-            self.rect.topleft = (
-                random.randint(0, int(WIDTH - TILE_SIZE)),
-                random.randint(0, int(HEIGHT - TILE_SIZE))
-            )
-            collision = False
-            # Check against existing rocks:
-            for rock in rocks:
-                if self.rect.colliderect(rock.rect):
-                    collision = True
-                    break
-            # Check against players:
-            for p in [player1, player2]:
-                if self.rect.colliderect(p.rect):
-                    collision = True
-                    break
-            # Check against trash:
-            for trash in level.trashes:
-                if self.rect.colliderect(trash.rect):
-                    collision = True
-                    break
-            # Check against algae:
-            for algae in algae_list:
-                if self.rect.colliderect(algae.rect):
-                    collision = True
-                    break
-            if not collision:
-                break
-
-    def draw(self, surface):
-        surface.blit(self.image, self.rect)
+        super().__init__()
+        self.buttons = create_pause_buttons()
+        # Create a semi-transparent dark blue overlay
+        # Use SRCALPHA for transparency
+        self.overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+        # Use RGBA format for the fill color
+        self.overlay.fill((*DARK_BLUE, PAUSE_OVERLAY_ALPHA))
 
-# Algae class with mask
-class Algae:
-    def __init__(self):
-        self.image = pygame.Surface((TILE_SIZE, TILE_SIZE))
-        self.image.fill(GREEN)
-        self.rect = self.image.get_rect()
-        self.mask = pygame.mask.from_surface(self.image)
-        
-        while True:
-            self.rect.topleft = (
-                random.randint(0, int(WIDTH - TILE_SIZE)),
-                random.randint(0, int(HEIGHT - TILE_SIZE))
-            )
-            collision = False
-            # Check against existing algae:
-            for algae in algae_list:
-                if self.rect.colliderect(algae.rect):
-                    collision = True
-                    break
-            # Check against players:
-            for p in [player1, player2]:
-                if self.rect.colliderect(p.rect):
-                    collision = True
-                    break
-            # Check against rocks:
-            for rock in rocks:
-                if self.rect.colliderect(rock.rect):
-                    collision = True
-                    break
-            # Check against trash:
-            for trash in level.trashes:
-                if self.rect.colliderect(trash.rect):
-                    collision = True
-                    break
-            if not collision:
-                break
+    def handle_event(self, event):
+        for button in self.buttons:
+            button.handle_event(event)
 
     def draw(self, surface):
-        surface.blit(self.image, self.rect)
-
-# Level class with 3 levels per stage
-class Level:
-    def __init__(self, stage, level_num):
-        self.stage = stage
-        self.level_num = level_num
-        self.trashes = []
-        self.required_orange = 5
-        self.required_teal = 5
+        surface.blit(self.overlay, (0, 0))
         
-        # Create non-overlapping trash
-        for _ in range(5):
-            self.trashes.append(Trash(ORANGE, self.trashes))
-        for _ in range(5):
-            self.trashes.append(Trash(TEAL, self.trashes))
-
-    def add_trash(self, color):
-        new_trash = Trash(color, self.trashes)
-        self.trashes.append(new_trash)
-        if color == ORANGE:
-            self.required_orange += 1
-        else:
-            self.required_teal += 1
-
-    def draw(self):
-        for trash in self.trashes:
-            trash.draw(screen)
-
-# Collision detection functions
-def check_mask_collision(sprite1, sprite2):
-    offset_x = sprite2.rect.x - sprite1.rect.x
-    offset_y = sprite2.rect.y - sprite1.rect.y
-    return sprite1.mask.overlap(sprite2.mask, (offset_x, offset_y)) is not None
-
-
-def check_wrong_trash_collisions():
-    for player in [player1, player2]:
-        current_touching = False
-        for trash in level.trashes:
-            if not trash.collected and check_mask_collision(player, trash):
-                if trash.color != player.trash_color:
-                    current_touching = True
-                    if not player.touching_wrong_trash:
-                        # Add 2 new pieces of the player's trash
-                        for _ in range(2):
-                            level.add_trash(player.trash_color)
-                        player.touching_wrong_trash = True
-        if not current_touching:
-            player.touching_wrong_trash = False
-
-def check_algae_collisions():
-    for player in [player1, player2]:
-        for algae in algae_list[:]:  # Iterate over a copy of the list
-            if check_mask_collision(player, algae):
-                player.immobilized = True
-                player.immobilized_start_time = time.time()
-                player.color = BLACK  # Turn player black
-                algae_list.remove(algae)  # Remove algae from the screen
-
-def check_collections():
-    all_collected = True
-    for trash in level.trashes:
-        if not trash.collected:
-            all_collected = False
-            for player in [player1, player2]:
-                if check_mask_collision(player, trash):
-                    if trash.color == player.trash_color:
-                        trash.collected = True
-    
-    if all_collected:
-        next_level()
-
-def next_level():
-    global level, level_num, stage
-    level_num += 1
-    if level_num <= 3:  # 3 levels per stage
-        level = Level(stage, level_num)
-    else:
-        next_stage()
-
-def next_stage():
-    global stage, level_num, rocks, algae_list
-    stage += 1
-    level_num = 1
-    if stage == 2:
-        display_stage_complete("Stage 1 Complete. Onto Stage 2...")
-        rocks = [Rock() for _ in range(10)]  # Add rocks for Stage 2
-    elif stage == 3:
-        display_stage_complete("Stage 2 Complete. Onto Stage 3...")
-        algae_list = [Algae() for _ in range(5)]  # Add algae for Stage 3
-    elif stage > 3:
-        end_game()
-    level = Level(stage, level_num)
-
-def display_stage_complete(message):
-    screen.fill(WHITE)
-    font = pygame.font.Font(None, 48)
-    text = font.render(message, True, BLACK)
-    screen.blit(text, (WIDTH//2 - 200, HEIGHT//2))
-    pygame.display.flip()
-    pygame.time.delay(3000)
-
-def run_game():
-    global current_screen, game_started, start_time, countdown_start
-    running = True
-    pause_buttons = create_pause_buttons()
-    
-    while running:
-        clock.tick(FPS)
+        # Draw pause menu text and buttons
+        pause_text = render_text("PAUSED", 72, WHITE)
+        surface.blit(pause_text, (WIDTH//2 - 100, HEIGHT//4))
         
-        # Event handling
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                exit()
-                
-            if event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_SPACE and game_started:
-                    current_screen = ScreenState.PAUSED
-                    
-            if current_screen == ScreenState.PAUSED:
-                for button in pause_buttons:
-                    button.handle_event(event)
-            
-            if current_screen == ScreenState.MAIN_MENU:
-                break
-
-        
-
-        # Handle countdown logic
-        if not game_started:
-            screen.fill(BLUE)  # Clear screen for countdown
-            elapsed = time.time() - countdown_start
-            remaining = countdown_seconds - int(elapsed)
-            
-            if remaining > 0:
-                # Draw countdown
-                text = countdown_font.render(str(remaining), True, WHITE)
-                text_rect = text.get_rect(center=(WIDTH//2, HEIGHT//2))
-                screen.blit(text, text_rect)
-                
-                # Draw game elements (static during countdown)
-                level.draw()
-                for rock in rocks:
-                    rock.draw(screen)
-                for algae in algae_list:
-                    algae.draw(screen)
-                player1.draw(screen)
-                player2.draw(screen)
-                
-                pygame.display.flip()
-                continue  # Skip the rest of the loop during countdown
+        for button in self.buttons:
+            button.draw(surface)
+
+
+# Single top-level loop: every screen is a scene on the stack, so starting,
+# restarting or leaving a game swaps scenes instead of nesting loops
+def main_loop(first_scene=None):
+    scenes.push(first_scene or MenuScene())
+    last_top = None
+    preloaded = False
+
+    while scenes.active:
+        if scenes.top.idle and not scenes.top.dirty:
+            # Nothing to show until something happens: sleep in the event queue
+            event = pygame.event.wait(IDLE_WAIT_MS)
+            if event.type == pygame.NOEVENT:
+                events = []
             else:
-                game_started = True
-                start_time = time.time()
-        
-        # Main game rendering (only if game is started and not paused)
-        if current_screen != ScreenState.PAUSED:
-            screen.fill(BLUE)
-            
-            # Draw game elements
-            level.draw()
-            for rock in rocks:
-                rock.draw(screen)
-            for algae in algae_list:
-                algae.draw(screen)
-            player1.draw(screen)
-            player2.draw(screen)
-            
-            # Handle player movement
-            keys = pygame.key.get_pressed()
-            player1.move(keys, pygame.K_w, pygame.K_s, pygame.K_a, pygame.K_d)
-            player2.move(keys, pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT)
-            
-            # Check collisions and collections
-            check_wrong_trash_collisions()
-            if stage == 3:
-                check_algae_collisions()
-            check_collections()
-            
-            # Draw UI elements
-            timer_text = pygame.font.Font(None, 36).render(
-                f"Time: {round(time.time()-start_time, 1)}s", True, WHITE)
-            screen.blit(timer_text, (WIDTH-200, 20))
-            
-            # Calculate remaining trash
-            orange_collected = sum(1 for t in level.trashes if t.color == ORANGE and t.collected)
-            teal_collected = sum(1 for t in level.trashes if t.color == TEAL and t.collected)
-            
-            level_text = pygame.font.Font(None, 36).render(
-                f"Stage: {stage}  Level: {level_num}  Orange: {orange_collected}/{level.required_orange}  Teal: {teal_collected}/{level.required_teal}", True, WHITE)
-            screen.blit(level_text, (20, 20))
-            
-        # Pause menu rendering
-        if current_screen == ScreenState.PAUSED:
-            # Create a semi-transparent dark blue overlay
-            overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)  # Use SRCALPHA for transparency
-            overlay.fill((*DARK_BLUE, PAUSE_OVERLAY_ALPHA))  # Use RGBA format for the fill color
-            screen.blit(overlay, (0, 0))
-            
-            # Draw pause menu text and buttons
-            pause_font = pygame.font.Font(None, 72)
-            pause_text = pause_font.render("PAUSED", True, WHITE)
-            screen.blit(pause_text, (WIDTH//2 - 100, HEIGHT//4))
-            
-            for button in pause_buttons:
-                button.draw(screen)
-                
-        pygame.display.flip()
-
-
-def end_game():
-    total_time = round(time.time() - start_time, 2)
-    screen.fill(WHITE)
-    font = pygame.font.Font(None, 48)
-    text = font.render(f"Game Over! Time: {total_time}s", True, BLACK)
-    screen.blit(text, (WIDTH//2 - 200, HEIGHT//4))
-    
-    # Leaderboard handling
-    team_name = ""
-    input_active = True
-    while input_active:
-        screen.fill(WHITE)
-        screen.blit(text, (WIDTH//2 - 200, HEIGHT//4))
-        prompt = font.render("Enter team name: " + team_name, True, BLACK)
-        screen.blit(prompt, (WIDTH//4, HEIGHT//2))
-        pygame.display.flip()
-        
-        for event in pygame.event.get():
+                events = [event] + pygame.event.get()
+            clock.tick()  # Time spent waiting is not frame time
+            dt = 0.0
+        else:
+            dt = clock.tick(FPS) / 1000
+            events = pygame.event.get()
+        profiler.begin_frame()
+
+        for event in events:
             if event.type == pygame.QUIT:
-                pygame.quit()
-                exit()
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_RETURN:
-                    input_active = False
-                elif event.key == pygame.K_BACKSPACE:
-                    team_name = team_name[:-1]
-                else:
-                    team_name += event.unicode
-
-    # Save to leaderboard
-    try:
-        with open(data_file, "r") as f:
-            leaderboard = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        leaderboard = []
-    
-    leaderboard.append({"team": team_name, "score": total_time})
-    leaderboard.sort(key=lambda x: x["score"])
-    
-    with open(data_file, "w") as f:
-        json.dump(leaderboard, f, indent=4)
-    
-    # Display leaderboard
-    screen.fill(WHITE)
-    title = font.render("Leaderboard:", True, BLACK)
-    screen.blit(title, (WIDTH//3, HEIGHT//4))
-    y = HEIGHT//3
-    for entry in leaderboard[:5]:
-        entry_text = font.render(f"{entry['team']}: {entry['score']}s", True, BLACK)
-        screen.blit(entry_text, (WIDTH//3, y))
-        y += 40
-    
-    pygame.display.flip()
-    pygame.time.delay(5000)
-    pygame.quit()
-    exit()
+                quit_game()
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                scenes.top.dirty = True
+            scenes.handle_event(event)
+        profiler.mark("events")
+
+        scenes.update(dt)
+        top = scenes.top
+        if top is None:
+            break
+        if top is not last_top:
+            if last_top is not None and last_top.self_presenting:
+                # Scenes drawn over the playfield need its last frame on the screen
+                # surface
+                renderer.capture()
+            # Whatever is on screen belongs to another scene
+            renderer.invalidate()
+            top.dirty = True
+            last_top = top
+
+        if top.idle and not top.dirty:
+            profiler.end_frame()
+            continue
+        scenes.draw(screen)
+        top.dirty = False
+        if not top.self_presenting:
+            display.present()
+        profiler.end_frame()
+
+        if not preloaded:
+            # The first frame is on screen; warm up the video decoder in the background
+            preload_decoder(INTRO_VIDEO)
+            preloaded = True
+
+
+# Stores a finished game and returns the top of the leaderboard for the results screen
+def save_score(team_name, total_time):
+    leaderboard = Leaderboard(data_file, legacy_json=legacy_data_file)
+    leaderboard.add(team_name, total_time)
+    top_entries = leaderboard.top(5)
+    leaderboard.close()
+    return top_entries
 
 # Game initialization
-player1 = Player(100, HEIGHT-100, (255,0,0), ORANGE, red_fish)
-player2 = Player(200, HEIGHT-100, (0,0,255), TEAL, blue_fish)
-stage = 1
-level_num = 1
-rocks = []
-algae_list = []
-level = Level(stage, level_num)
+game = None
+reset_game_state()
+scenes = SceneManager()
 
 # Countdown setup
-countdown_font = pygame.font.Font(None, 120)
-countdown_seconds = 3
-game_started = False
+countdown_font_size = 120
 
-# Start with main menu
-main_menu()
+# HUD labels, re-rendered only when their text changes
+timer_label = TextLabel(36, WHITE)
+level_label = TextLabel(36, WHITE)
 
-pygame.quit()
+if __name__ == "__main__":
+    # Start with main menu
+    main_loop()
+
+    pygame.quit()
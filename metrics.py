@@ -0,0 +1,39 @@
+import math
+
+from simulation import PLAYER1_KEYS, PLAYER2_KEYS, KeyState
+
+# Shared by the headless tools (bench.py, sim_runner.py): the scripted input
+# both fish follow, and how distributions are summarized.
+
+# Scripted input: (ticks, player 1 directions, player 2 directions), repeated.
+# Directions are indexes into the (up, down, left, right) key tuples.
+UP, DOWN, LEFT, RIGHT = range(4)
+SCRIPT = [
+    (45, [UP], [UP]),
+    (60, [RIGHT], [LEFT]),
+    (30, [UP, RIGHT], [UP, LEFT]),
+    (60, [LEFT], [RIGHT]),
+    (45, [DOWN], [DOWN]),
+    (30, [DOWN, LEFT], [DOWN, RIGHT]),
+    (20, [RIGHT], [RIGHT]),
+    (20, [LEFT], [LEFT]),
+]
+
+
+def scripted_keys():
+    # Yields one KeyState per tick, cycling through SCRIPT forever
+    while True:
+        for ticks, p1_dirs, p2_dirs in SCRIPT:
+            keys = KeyState([PLAYER1_KEYS[d] for d in p1_dirs]
+                            + [PLAYER2_KEYS[d] for d in p2_dirs])
+            for _ in range(ticks):
+                yield keys
+
+
+def percentile(sorted_values, pct):
+    # Nearest rank: the smallest value with at least pct% of the values at or
+    # below it
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct / 100 * len(sorted_values)) - 1
+    return sorted_values[min(len(sorted_values) - 1, max(0, rank))]
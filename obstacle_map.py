@@ -0,0 +1,57 @@
+import itertools
+
+import pygame
+
+# Versions are unique across maps, so a cached layer never matches a new game's map
+_versions = itertools.count(1)
+
+
+# Static obstacles baked into one playfield-sized bitmap.
+# Obstacles are drawn into the mask when a stage sets them up, so testing a
+# moving rect or sprite mask against all of them is a single overlap call,
+# however many obstacles there are. Obstacles sit on separate grid cells, so
+# one can be erased again without touching its neighbours. `version` changes
+# with every edit, for caches of what the map covers (e.g. the static layers).
+class ObstacleMap:
+    def __init__(self, width, height):
+        self.mask = pygame.mask.Mask((int(width), int(height)))
+        # size -> fully set mask, shared by every rect of that size
+        self.solid_masks = {}
+        self.count = 0
+        self.version = next(_versions)
+
+    def _solid(self, size):
+        mask = self.solid_masks.get(size)
+        if mask is None:
+            mask = self.solid_masks[size] = pygame.mask.Mask(size, fill=True)
+        return mask
+
+    def clear(self):
+        self.mask.clear()
+        self.count = 0
+        self.version = next(_versions)
+
+    def rebuild(self, rects):
+        self.clear()
+        for rect in rects:
+            self.add(rect)
+
+    def add(self, rect):
+        self.mask.draw(self._solid(rect.size), rect.topleft)
+        self.count += 1
+        self.version = next(_versions)
+
+    def remove(self, rect):
+        self.mask.erase(self._solid(rect.size), rect.topleft)
+        self.count -= 1
+        self.version = next(_versions)
+
+    def hits_rect(self, rect):
+        if not self.count:
+            return False
+        return self.mask.overlap(self._solid(rect.size), rect.topleft) is not None
+
+    def hits_mask(self, mask, topleft):
+        if not self.count:
+            return False
+        return self.mask.overlap(mask, topleft) is not None
@@ -0,0 +1,84 @@
+import random
+
+import pygame
+
+
+# Occupancy grid over the playfield used to spawn trash, rocks and algae.
+# Free cells are kept in a list with a reverse index so sampling, occupying
+# and releasing a cell are all O(1); a full board is reported as None
+# instead of retrying forever.
+class PlacementGrid:
+    def __init__(self, width, height, cell_size, rng=random):
+        self.cell_size = int(cell_size)
+        self.cols = int(width) // self.cell_size
+        self.rows = int(height) // self.cell_size
+        self.rng = rng
+        self.reset()
+
+    def reset(self):
+        count = self.cols * self.rows
+        # Number of things covering each cell; a cell is free when its count is 0
+        self.counts = [0] * count
+        self.free = list(range(count))
+        self.free_index = list(range(count))
+
+    def _cells_for(self, rect):
+        cs = self.cell_size
+        x0 = max(0, int(rect.left) // cs)
+        y0 = max(0, int(rect.top) // cs)
+        x1 = min(self.cols - 1, (int(rect.right) - 1) // cs)
+        y1 = min(self.rows - 1, (int(rect.bottom) - 1) // cs)
+        return [cy * self.cols + cx
+                for cy in range(y0, y1 + 1) for cx in range(x0, x1 + 1)]
+
+    def _take(self, cell):
+        # Swap-remove from the free list
+        pos = self.free_index[cell]
+        last = self.free.pop()
+        if last != cell:
+            self.free[pos] = last
+            self.free_index[last] = pos
+        self.free_index[cell] = -1
+
+    def _give(self, cell):
+        self.free_index[cell] = len(self.free)
+        self.free.append(cell)
+
+    def occupy(self, rect):
+        for cell in self._cells_for(rect):
+            if self.counts[cell] == 0:
+                self._take(cell)
+            self.counts[cell] += 1
+
+    def release(self, rect):
+        for cell in self._cells_for(rect):
+            if self.counts[cell] == 0:
+                continue
+            self.counts[cell] -= 1
+            if self.counts[cell] == 0:
+                self._give(cell)
+
+    def is_free(self, rect):
+        return all(self.counts[cell] == 0 for cell in self._cells_for(rect))
+
+    def is_full(self):
+        return not self.free
+
+    def place(self, avoid=()):
+        # Picks a random free cell, marks it occupied and returns its rect.
+        # Cells under the rects in `avoid` (e.g. players) are excluded only for
+        # this call.
+        for rect in avoid:
+            self.occupy(rect)
+        try:
+            if not self.free:
+                return None
+            cell = self.free[self.rng.randrange(len(self.free))]
+            cs = self.cell_size
+            x, y = cell % self.cols, cell // self.cols
+            rect = pygame.Rect(x * cs, y * cs, cs, cs)
+            self.occupy(rect)
+            return rect
+        finally:
+            for rect in avoid:
+                self.release(rect)
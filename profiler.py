@@ -0,0 +1,150 @@
+import atexit
+import csv
+import json
+import os
+import time
+
+import numpy as np
+import pygame
+
+from text_cache import TextLabel, render_text
+
+# Per-phase frame profiler.
+# Each frame is split into phases with mark(name), which charges the time since
+# the previous mark to that phase. Samples go into a fixed-size ring buffer, can
+# be shown as an in-game overlay and are written to CSV/JSONL on exit.
+# While disabled, begin_frame/mark/end_frame are bound to a no-op, so the
+# instrumentation costs one empty call per mark.
+
+PHASES = ("events", "move", "wrong_trash", "algae", "collections", "draw", "present")
+PROFILE_CAPACITY = 1800  # 30 s at 60 FPS
+PROFILE_ENV = "OCEAN_PROFILE"  # set to enable profiling from startup
+PROFILE_EXPORT = "profile_samples"  # .csv and .jsonl are written next to the game
+
+OVERLAY_WIDTH = 320
+OVERLAY_GRAPH_HEIGHT = 60
+OVERLAY_LINE_HEIGHT = 18
+OVERLAY_SCALE_MS = 33.3  # frame time at the top of the graph
+
+
+def _noop(*args):
+    pass
+
+
+class FrameProfiler:
+    def __init__(self, capacity=PROFILE_CAPACITY, phases=PHASES):
+        self.capacity = capacity
+        self.phases = list(phases)
+        self.phase_index = {name: i for i, name in enumerate(self.phases)}
+        # One row per frame: every phase, then the whole frame (milliseconds)
+        self.samples = np.zeros((capacity, len(self.phases) + 1))
+        self.current = [0.0] * len(self.phases)
+        self.frames = 0
+        self.frame_start = 0.0
+        self.last_mark = 0.0
+        self.enabled = False
+        self.overlay_visible = False
+        self.overlay_surface = None
+        self.overlay_labels = None
+        self.exit_hook = False
+        self.disable()
+
+    def enable(self):
+        self.enabled = True
+        self.frame_start = self.last_mark = time.perf_counter()
+        self.begin_frame = self._begin_frame
+        self.mark = self._mark
+        self.end_frame = self._end_frame
+        if not self.exit_hook:
+            atexit.register(self.export)
+            self.exit_hook = True
+
+    def disable(self):
+        self.enabled = False
+        self.overlay_visible = False
+        self.begin_frame = _noop
+        self.mark = _noop
+        self.end_frame = _noop
+
+    def toggle_overlay(self):
+        if not self.enabled:
+            self.enable()
+        self.overlay_visible = not self.overlay_visible
+
+    def _begin_frame(self):
+        self.frame_start = self.last_mark = time.perf_counter()
+        for i in range(len(self.current)):
+            self.current[i] = 0.0
+
+    def _mark(self, phase):
+        now = time.perf_counter()
+        self.current[self.phase_index[phase]] += now - self.last_mark
+        self.last_mark = now
+
+    def _end_frame(self):
+        row = self.samples[self.frames % self.capacity]
+        row[:-1] = self.current
+        row[-1] = time.perf_counter() - self.frame_start
+        row *= 1000
+        self.frames += 1
+
+    def recorded(self):
+        # Samples in recording order, oldest first, with their frame numbers
+        count = min(self.frames, self.capacity)
+        first = self.frames - count
+        order = [(first + i) % self.capacity for i in range(count)]
+        return range(first, self.frames), self.samples[order]
+
+    def export(self, base_path=PROFILE_EXPORT):
+        if self.frames == 0:
+            return
+        frame_numbers, rows = self.recorded()
+        columns = self.phases + ["frame"]
+        with open(base_path + ".csv", "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["frame_number"] + [c + "_ms" for c in columns])
+            for number, row in zip(frame_numbers, rows, strict=True):
+                writer.writerow([number] + [f"{v:.4f}" for v in row])
+        with open(base_path + ".jsonl", "w") as f:
+            for number, row in zip(frame_numbers, rows, strict=True):
+                record = {"frame_number": number}
+                record.update({c + "_ms": round(float(v), 4)
+                               for c, v in zip(columns, row, strict=True)})
+                f.write(json.dumps(record) + "\n")
+
+    def overlay(self):
+        # Frame-time graph plus average time per phase; the surface is reused
+        # between frames
+        height = OVERLAY_GRAPH_HEIGHT + OVERLAY_LINE_HEIGHT * (len(self.phases) + 1) + 8
+        if self.overlay_surface is None:
+            self.overlay_surface = pygame.Surface((OVERLAY_WIDTH, height))
+            self.overlay_labels = [TextLabel(20, (255, 255, 255))
+                                   for _ in range(len(self.phases) + 1)]
+        surface = self.overlay_surface
+        surface.fill((20, 20, 30))
+
+        _, rows = self.recorded()
+        frame_ms = rows[-OVERLAY_WIDTH // 2:, -1]
+        scale = OVERLAY_GRAPH_HEIGHT / OVERLAY_SCALE_MS
+        for i, ms in enumerate(frame_ms):
+            bar = min(OVERLAY_GRAPH_HEIGHT, int(ms * scale))
+            color = (80, 200, 120) if ms <= 1000 / 60 else (230, 90, 70)
+            pygame.draw.rect(surface, color,
+                             (i * 2, OVERLAY_GRAPH_HEIGHT - bar, 2, bar))
+        budget_y = OVERLAY_GRAPH_HEIGHT - int(1000 / 60 * scale)
+        pygame.draw.line(surface, (200, 200, 200),
+                         (0, budget_y), (OVERLAY_WIDTH, budget_y))
+
+        averages = rows.mean(axis=0) if len(rows) else np.zeros(len(self.phases) + 1)
+        y = OVERLAY_GRAPH_HEIGHT + 4
+        names = self.phases + ["frame"]
+        for label, name, ms in zip(self.overlay_labels, names, averages, strict=True):
+            surface.blit(render_text(name, 20, (255, 255, 255)), (6, y))
+            surface.blit(label.render(f"{ms:.2f} ms"), (140, y))
+            y += OVERLAY_LINE_HEIGHT
+        return surface
+
+
+profiler = FrameProfiler()
+if os.environ.get(PROFILE_ENV):
+    profiler.enable()
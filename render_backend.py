@@ -0,0 +1,233 @@
+import logging
+import os
+import weakref
+
+import pygame
+
+from dirty_rects import DirtyRectRenderer
+from profiler import profiler
+
+# Display backends.
+# Both give the game a `surface` that menus, banners, fades and the intro draw
+# on, present() to show it, and a sprite renderer for the playfield with the
+# DirtyRectRenderer interface (set_background, mark_dirty, invalidate, render),
+# and mouse_pos() for the pointer in game coordinates.
+#
+# SurfaceDisplay is the software path: pygame.display surface, flip and dirty
+# rects.
+# TextureDisplay renders through pygame._sdl2.video: playfield sprites, text and
+# the static background are uploaded once per surface as textures and drawn
+# (with their alpha) by the GPU, which also scales the frame to the window.
+# Whole-surface scenes are uploaded as one streaming texture per presented frame.
+#
+# OCEAN_RENDERER picks the backend: "surface" (default), "gpu", or
+# "gpu-software" for SDL's software renderer (CI, dummy video driver).
+# When no renderer can be created the game falls back to the surface path.
+#
+# The game always draws at its logical resolution. OCEAN_DISPLAY sets the real
+# window: "window" (default, logical size), "WIDTHxHEIGHT", or "fullscreen";
+# the frame is scaled to fit it once per presented frame. OCEAN_RENDER_SCALE
+# (e.g. 0.5) draws the playfield into a smaller render target first, for weak
+# hardware; only the texture renderer supports it, the surface path always
+# draws at logical resolution. Scales outside (0, 1] are ignored with a warning.
+
+RENDERER_ENV = "OCEAN_RENDERER"
+DISPLAY_ENV = "OCEAN_DISPLAY"
+RENDER_SCALE_ENV = "OCEAN_RENDER_SCALE"
+
+logger = logging.getLogger(__name__)
+
+
+class SurfaceDisplay:
+    def __init__(self, size, caption, window_size=None, fullscreen=False):
+        flags = 0
+        if window_size or fullscreen:
+            # SDL scales the logical surface to the window
+            flags = pygame.SCALED | (pygame.FULLSCREEN if fullscreen else 0)
+        self.surface = pygame.display.set_mode(size, flags)
+        pygame.display.set_caption(caption)
+        if window_size and not fullscreen:
+            from pygame._sdl2.video import Window
+            Window.from_display_module().size = window_size
+
+    def present(self):
+        pygame.display.flip()
+
+    def mouse_pos(self):
+        # pygame already reports the mouse in logical coordinates in SCALED mode
+        return pygame.mouse.get_pos()
+
+    def sprite_renderer(self, background_color, enabled=True):
+        return DirtyRectRenderer(self.surface, background_color, enabled=enabled)
+
+
+class TextureDisplay:
+    def __init__(self, size, caption, accelerated=True, window_size=None,
+                 fullscreen=False, render_scale=1.0):
+        # Private pygame API, only imported when this backend is asked for
+        from pygame._sdl2.video import Renderer, Texture, Window
+        self.texture_type = Texture
+        self.size = size
+        if fullscreen:
+            self.window = Window(caption, size, fullscreen_desktop=True)
+        else:
+            self.window = Window(caption, window_size or size)
+        try:
+            self.renderer = Renderer(self.window, accelerated=1 if accelerated else 0)
+        except RuntimeError:
+            self.window.destroy()
+            raise
+        # Drawing happens in game coordinates; the renderer scales to the window
+        self.renderer.logical_size = size
+        self.surface = pygame.Surface(size)
+        self.frame = Texture(self.renderer, size, streaming=True)
+
+        # Reduced internal resolution: the playfield is drawn into a smaller
+        # target, then upscaled
+        internal_size = (max(1, round(size[0] * render_scale)),
+                         max(1, round(size[1] * render_scale)))
+        self.target = None
+        if internal_size != size:
+            self.target = Texture(self.renderer, internal_size, target=True)
+
+    def present(self):
+        self.frame.update(self.surface)
+        self.renderer.draw_color = pygame.Color(0, 0, 0)
+        self.renderer.clear()
+        self.frame.draw()
+        self.renderer.present()
+
+    def begin_frame(self):
+        if self.target is not None:
+            self.renderer.target = self.target
+            self.renderer.logical_size = self.size
+
+    def end_frame(self):
+        if self.target is not None:
+            self.renderer.target = None
+            self.renderer.draw_color = pygame.Color(0, 0, 0)
+            self.renderer.clear()
+            self.target.draw(dstrect=(0, 0) + self.size)
+        self.renderer.present()
+
+    def mouse_pos(self):
+        # SDL converts mouse events to logical coordinates, but not the polled
+        # position: undo the renderer's scaling and letterboxing here
+        x, y = pygame.mouse.get_pos()
+        window_width, window_height = self.window.size
+        scale = min(window_width / self.size[0], window_height / self.size[1])
+        left = (window_width - self.size[0] * scale) / 2
+        top = (window_height - self.size[1] * scale) / 2
+        return int((x - left) // scale), int((y - top) // scale)
+
+    # enabled is for dirty rects; texture frames are always drawn in full
+    def sprite_renderer(self, background_color, enabled=True):  # noqa: ARG002
+        return TextureRenderer(self, background_color)
+
+
+# Playfield renderer for TextureDisplay.
+# Every frame is drawn in full from textures; a texture is created the first
+# time its surface is drawn and dropped with the surface. Surfaces redrawn in
+# place (the profiler overlay) are re-uploaded when their rect is marked dirty.
+class TextureRenderer:
+    def __init__(self, display, background_color):
+        self.display = display
+        self.renderer = display.renderer
+        self.background_color = background_color
+        self.background = None
+        self.textures = weakref.WeakKeyDictionary()
+        self.stale = []
+        self.last = []
+
+    def invalidate(self):
+        pass  # Nothing is kept on screen between frames
+
+    def mark_dirty(self, rect):
+        self.stale.append(pygame.Rect(rect))
+
+    def set_background(self, background):
+        self.background = background
+
+    def _texture(self, image, rect):
+        texture = self.textures.get(image)
+        if texture is None:
+            texture = self.display.texture_type.from_surface(self.renderer, image)
+            self.textures[image] = texture
+        elif self.stale and rect.collidelist(self.stale) != -1:
+            texture.update(image)
+        return texture
+
+    def render(self, sprites):
+        renderer = self.renderer
+        self.display.begin_frame()
+        renderer.draw_color = pygame.Color(self.background_color)
+        renderer.clear()
+        if self.background is not None:
+            self._texture(self.background, self.background.get_rect()).draw()
+        for _, image, rect in sprites:
+            self._texture(image, pygame.Rect(rect)).draw(dstrect=rect)
+        profiler.mark("draw")
+        self.display.end_frame()
+        profiler.mark("present")
+        self.stale = []
+        self.last = sprites
+
+    def capture(self):
+        # Paints the last frame onto the display surface, for scenes drawn over it
+        # (pause menu)
+        surface = self.display.surface
+        surface.fill(self.background_color)
+        if self.background is not None:
+            surface.blit(self.background, (0, 0))
+        for _, image, rect in self.last:
+            surface.blit(image, rect)
+
+
+# OCEAN_DISPLAY value -> (window size or None, fullscreen)
+def parse_display_mode(value):
+    value = (value or "window").strip().lower()
+    if value == "fullscreen":
+        return None, True
+    if value == "window":
+        return None, False
+    try:
+        width, height = (int(v) for v in value.split("x"))
+    except ValueError as e:
+        raise ValueError(f"{DISPLAY_ENV} must be 'window', 'fullscreen' or "
+                         f"WIDTHxHEIGHT, not {value!r}") from e
+    return (width, height), False
+
+
+# OCEAN_RENDER_SCALE value -> playfield scale in (0, 1], 1 when unset or unusable
+def parse_render_scale(value):
+    if value is None or not value.strip():
+        return 1.0
+    try:
+        scale = float(value)
+    except ValueError:
+        scale = None
+    if scale is None or not 0 < scale <= 1:
+        logger.warning("%s must be a number in (0, 1], not %r; drawing at full "
+                       "resolution", RENDER_SCALE_ENV, value)
+        return 1.0
+    return scale
+
+
+def open_display(size, caption, backend=None):
+    size = (int(size[0]), int(size[1]))
+    backend = backend or os.environ.get(RENDERER_ENV, "surface")
+    window_size, fullscreen = parse_display_mode(os.environ.get(DISPLAY_ENV))
+    render_scale = parse_render_scale(os.environ.get(RENDER_SCALE_ENV))
+    if backend in ("gpu", "gpu-software"):
+        try:
+            return TextureDisplay(size, caption, accelerated=backend == "gpu",
+                                  window_size=window_size, fullscreen=fullscreen,
+                                  render_scale=render_scale)
+        except (ImportError, RuntimeError) as e:
+            logger.warning("Texture renderer unavailable (%s); "
+                           "using the surface renderer", e)
+    if render_scale != 1:
+        logger.warning("%s is only supported by the texture renderer; "
+                       "drawing at full resolution", RENDER_SCALE_ENV)
+    return SurfaceDisplay(size, caption, window_size=window_size,
+                          fullscreen=fullscreen)
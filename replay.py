@@ -0,0 +1,292 @@
+import argparse
+import io
+import os
+import random
+import struct
+import time
+
+from constants import TILE_SIZE
+from layouts import (
+    DEFAULT_DIFFICULTY,
+    DIFFICULTIES,
+    DIFFICULTY_ENV,
+    difficulty_from_env,
+)
+from level_packs import PACK_ENV, open_level_pack
+from simulation import PLAYER1_KEYS, PLAYER2_KEYS, SIM_DT, Game, KeyState
+
+# Deterministic input recording and replay.
+# A game is fully determined by its RNG seed, where its levels come from and
+# the keys held on every simulation tick, so that is all a recording holds: a
+# small header with the seed and the level source (the OCEAN_DIFFICULTY name,
+# or the OCEAN_LEVEL_PACK game), then run-length encoded 8-bit masks of the
+# movement keys. A replay under another level source is refused instead of
+# drifting out of sync. Records are appended as the game runs, so a recording
+# cut short by a crash still replays up to that point. Collisions use the fish
+# sprites' masks, so a recording only replays faithfully with the same fish
+# images.
+#
+#   Record:  OCEAN_RECORD=recordings python main.py
+#   Replay:  python replay.py recordings/<file>.ocr             (headless, full speed)
+#            python replay.py recordings/<file>.ocr --realtime  (in the game window)
+
+RECORD_ENV = "OCEAN_RECORD"  # directory to record every game into
+REPLAY_MAGIC = b"OCRP"
+# Bumped when the same seed and keys play out differently (2: level_gen layouts)
+# or the header changes (3: level source)
+REPLAY_VERSION = 3
+# magic, version, ticks per second, seed, difficulty name (empty with a level
+# pack), LevelPack.game_id (0 without a pack)
+REPLAY_HEADER = struct.Struct("<4sHHQ8sQ")
+
+# Bit i of a tick mask is MOVEMENT_KEYS[i]
+MOVEMENT_KEYS = PLAYER1_KEYS + PLAYER2_KEYS
+
+# Body records: varint tick count followed by a key mask, or a zero count
+# followed by an event code
+EVENT_RESTART_COUNTDOWN = 1
+
+TICK_RATE = round(1 / SIM_DT)
+FLUSH_TICKS = 60  # at most a second of input is lost if the game dies
+
+
+def key_mask(keys):
+    mask = 0
+    for bit, key in enumerate(MOVEMENT_KEYS):
+        if keys[key]:
+            mask |= 1 << bit
+    return mask
+
+
+_mask_keys = [
+    KeyState([key for bit, key in enumerate(MOVEMENT_KEYS) if mask >> bit & 1])
+    for mask in range(256)
+]
+
+
+def mask_keys(mask):
+    return _mask_keys[mask]
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(f):
+    value = 0
+    shift = 0
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None  # End of the recording (or a record cut short)
+        value |= (byte[0] & 0x7F) << shift
+        if byte[0] < 0x80:
+            return value
+        shift += 7
+
+
+def new_seed():
+    return random.getrandbits(63)
+
+
+def level_source(difficulty, pack_game_id):
+    # (difficulty, pack game id) as stored in the header; with a level pack
+    # the difficulty plays no part
+    if pack_game_id:
+        return "", pack_game_id
+    return difficulty, 0
+
+
+def _describe_source(source):
+    difficulty, pack_game_id = source
+    if pack_game_id:
+        return f"level pack game {pack_game_id:016x}"
+    return f"difficulty {difficulty!r} and no level pack"
+
+
+# Records one game. Attach it as game.recorder. Records are buffered and
+# appended to the file on flush(); the file is only created once there is a
+# tick to write, so games that are never played leave nothing behind.
+class InputRecorder:
+    def __init__(self, path, seed, difficulty=DEFAULT_DIFFICULTY, pack_game_id=0):
+        named = isinstance(difficulty, str) and difficulty in DIFFICULTIES
+        if not pack_game_id and not named:
+            raise ValueError("only named difficulties can be recorded")
+        self.path = path
+        self.seed = seed
+        self.source = level_source(difficulty, pack_game_id)
+        self.pending = bytearray()
+        self.created = False
+        self.ticks = 0
+        self.mask = None
+        self.run = 0
+        self.unflushed = 0
+
+    def _end_run(self):
+        if self.run:
+            _write_varint(self.pending, self.run)
+            self.pending.append(self.mask)
+            self.run = 0
+
+    def tick(self, keys):
+        mask = key_mask(keys)
+        if mask != self.mask:
+            self._end_run()
+            self.mask = mask
+        self.run += 1
+        self.ticks += 1
+        self.unflushed += 1
+        if self.unflushed >= FLUSH_TICKS:
+            self.flush()
+
+    def restart_countdown(self):
+        if not self.ticks:
+            return  # Nothing recorded yet; a new game starts with the countdown anyway
+        self._end_run()
+        _write_varint(self.pending, 0)
+        self.pending.append(EVENT_RESTART_COUNTDOWN)
+
+    def flush(self):
+        # Writes the current run too; the next tick starts a new one
+        if not self.ticks:
+            return
+        self._end_run()
+        if not self.created:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            difficulty, pack_game_id = self.source
+            self.pending[:0] = REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION,
+                                                  TICK_RATE, self.seed,
+                                                  difficulty.encode(), pack_game_id)
+        with open(self.path, "ab" if self.created else "wb") as f:
+            f.write(self.pending)
+        self.created = True
+        self.pending.clear()
+        self.unflushed = 0
+
+    def close(self):
+        self.flush()
+
+
+# A recorder for a new game (made with random.Random(seed)) when OCEAN_RECORD
+# is set, otherwise None
+def open_recorder(game, seed, directory=None):
+    directory = directory or os.environ.get(RECORD_ENV)
+    if not directory:
+        return None
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{seed}.ocr"
+    return InputRecorder(os.path.join(directory, name), seed, game.difficulty,
+                         game.pack_game_id)
+
+
+# Re-drives a Game from a recording, one tick per step() call.
+# Create the game with new_game() so it gets the recorded seed.
+class ReplayPlayer:
+    def __init__(self, path):
+        # Recordings are small (a few KB for a whole game), so read it in one go
+        with open(path, "rb") as f:
+            header = f.read(REPLAY_HEADER.size)
+            body = f.read()
+        try:
+            (magic, version, tick_rate, self.seed,
+             difficulty, pack_game_id) = REPLAY_HEADER.unpack(header)
+        except struct.error as e:
+            raise ValueError(f"{path} is not a replay file") from e
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError(f"{path} is not a version {REPLAY_VERSION} replay file")
+        if tick_rate != TICK_RATE:
+            raise ValueError(f"{path} was recorded at {tick_rate} ticks per second, "
+                             f"not {TICK_RATE}")
+        self.path = path
+        self.source = (difficulty.rstrip(b"\0").decode(), pack_game_id)
+        self.body = io.BytesIO(body)
+        self.keys = mask_keys(0)
+        self.remaining = 0
+        self.finished = False
+
+    def new_game(self, red_image, blue_image, prefetch=False, pack=None,
+                 difficulty=DEFAULT_DIFFICULTY):
+        # Raises ValueError when the game would not get the recorded levels
+        game = Game(red_image, blue_image, rng=random.Random(self.seed),
+                    prefetch=prefetch, pack=pack, difficulty=difficulty)
+        source = level_source(difficulty, game.pack_game_id)
+        if source != self.source:
+            raise ValueError(f"{self.path} was recorded with "
+                             f"{_describe_source(self.source)}, not "
+                             f"{_describe_source(source)}; set {DIFFICULTY_ENV} "
+                             f"and {PACK_ENV} as they were when it was recorded")
+        return game
+
+    def _next_run(self, game):
+        while True:
+            count = _read_varint(self.body)
+            code = self.body.read(1)
+            if count is None or not code:
+                return False
+            if count:
+                self.keys = mask_keys(code[0])
+                self.remaining = count
+                return True
+            if code[0] == EVENT_RESTART_COUNTDOWN:
+                game.restart_countdown()
+
+    def step(self, game):
+        # Same contract as Game.step: True when events were queued; also True
+        # at the end of the recording
+        if self.remaining == 0 and not self._next_run(game):
+            self.finished = True
+            return True
+        self.remaining -= 1
+        return game.step(self.keys)
+
+
+def replay_headless(path):
+    # Same sprites as the game, so collisions (masks) come out the same
+    from assets import load_scaled_image
+    fish_size = (TILE_SIZE + 20, TILE_SIZE + 20)
+    player = ReplayPlayer(path)
+    game = player.new_game(load_scaled_image("redfish.png", fish_size, alpha=True),
+                           load_scaled_image("bluefish.png", fish_size, alpha=True),
+                           pack=open_level_pack(), difficulty=difficulty_from_env())
+    start = time.perf_counter()
+    while not player.finished and not game.finished:
+        player.step(game)
+    wall = time.perf_counter() - start
+    game.pop_events()
+    return game, wall
+
+
+def replay_realtime(path):
+    # The real game loop and renderer, with the recording in place of the keyboard
+    import main
+    player = ReplayPlayer(path)
+    main.game = player.new_game(main.red_fish, main.blue_fish, prefetch=True,
+                                pack=main.level_pack, difficulty=main.difficulty)
+    main.main_loop(main.GameplayScene(replay=player))
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded game")
+    parser.add_argument("recording")
+    parser.add_argument("--realtime", action="store_true",
+                        help="play in the game window at normal speed")
+    args = parser.parse_args(argv)
+
+    if args.realtime:
+        replay_realtime(args.recording)
+        return
+
+    game, wall = replay_headless(args.recording)
+    if game.finished:
+        state = "finished"
+    else:
+        state = f"stopped at stage {game.stage} level {game.level_num}"
+    speed = game.ticks * SIM_DT / wall
+    print(f"{game.ticks} ticks replayed in {wall:.3f} s ({speed:.0f}x real time); "
+          f"game {state}, time {game.elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    main_cli()
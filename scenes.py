@@ -0,0 +1,169 @@
+import pygame
+
+from constants import BLACK, HEIGHT, WHITE, WIDTH
+from text_cache import TextLabel, render_text
+
+# Scenes are advanced by the main loop once per frame instead of blocking in
+# their own loops: handle_event() for every input event, update(dt) with the
+# frame time in seconds, then draw(surface). A scene calls finish() when it is
+# over; the manager then pops it and runs its on_done callback.
+
+FADE_SECONDS = 1.5
+BANNER_SECONDS = 3
+RESULTS_SECONDS = 5
+
+
+class Scene:
+    # Scenes that present their own frames (e.g. with dirty rects) skip the loop's
+    # display flip
+    self_presenting = False
+    # Idle scenes only change on input: the loop blocks waiting for events and
+    # redraws them only while `dirty` is set
+    idle = False
+
+    def __init__(self, on_done=None):
+        self.on_done = on_done
+        self.done = False
+        self.dirty = True
+
+    def finish(self):
+        self.done = True
+
+    def handle_event(self, event):
+        pass
+
+    def update(self, dt):
+        pass
+
+    def draw(self, surface):
+        pass
+
+
+class SceneManager:
+    def __init__(self):
+        self.stack = []
+
+    @property
+    def active(self):
+        return bool(self.stack)
+
+    @property
+    def top(self):
+        return self.stack[-1] if self.stack else None
+
+    def push(self, scene):
+        self.stack.append(scene)
+
+    def pop(self):
+        return self.stack.pop() if self.stack else None
+
+    def handle_event(self, event):
+        if self.stack:
+            self.stack[-1].handle_event(event)
+
+    def update(self, dt):
+        if not self.stack:
+            return
+        scene = self.stack[-1]
+        scene.update(dt)
+        if scene.done:
+            if self.stack and self.stack[-1] is scene:
+                self.stack.pop()
+            if scene.on_done is not None:
+                scene.on_done()
+
+    def draw(self, surface):
+        # Only the top scene is drawn; scenes over gameplay (fades, the pause
+        # menu) start from what is already on the surface
+        if self.stack:
+            self.stack[-1].draw(surface)
+
+
+# Fades whatever is on screen to a color over `duration` seconds
+class FadeOut(Scene):
+    def __init__(self, duration=FADE_SECONDS, color=BLACK, on_done=None):
+        super().__init__(on_done)
+        self.duration = duration
+        self.elapsed = 0.0
+        self.snapshot = None
+        self.fade = pygame.Surface((WIDTH, HEIGHT))
+        self.fade.fill(color)
+
+    def update(self, dt):
+        self.elapsed += dt
+        if self.elapsed >= self.duration:
+            self.finish()
+
+    def draw(self, surface):
+        if self.snapshot is None:
+            self.snapshot = surface.copy()
+        surface.blit(self.snapshot, (0, 0))
+        self.fade.set_alpha(int(255 * min(1.0, self.elapsed / self.duration)))
+        surface.blit(self.fade, (0, 0))
+
+
+# Full-screen message shown for `duration` seconds (stage complete)
+class Banner(Scene):
+    def __init__(self, message, duration=BANNER_SECONDS, on_done=None):
+        super().__init__(on_done)
+        self.message = message
+        self.duration = duration
+        self.elapsed = 0.0
+
+    def update(self, dt):
+        self.elapsed += dt
+        if self.elapsed >= self.duration:
+            self.finish()
+
+    def draw(self, surface):
+        surface.fill(WHITE)
+        text = render_text(self.message, 48, BLACK)
+        surface.blit(text, (WIDTH//2 - 200, HEIGHT//2))
+
+
+# Game over: team name entry, then the top of the leaderboard for `duration` seconds.
+# save_score(team, time) stores the result and returns the entries to show.
+class ResultsScreen(Scene):
+    def __init__(self, total_time, save_score, duration=RESULTS_SECONDS, on_done=None):
+        super().__init__(on_done)
+        self.total_time = round(total_time, 2)
+        self.save_score = save_score
+        self.duration = duration
+        self.elapsed = 0.0
+        self.team_name = ""
+        self.entries = None  # Set once the score has been saved
+        self.prompt_label = TextLabel(48, BLACK)
+
+    def handle_event(self, event):
+        if self.entries is not None or event.type != pygame.KEYDOWN:
+            return
+        if event.key == pygame.K_RETURN:
+            self.entries = self.save_score(self.team_name, self.total_time)
+        elif event.key == pygame.K_BACKSPACE:
+            self.team_name = self.team_name[:-1]
+        else:
+            self.team_name += event.unicode
+
+    def update(self, dt):
+        if self.entries is None:
+            return
+        self.elapsed += dt
+        if self.elapsed >= self.duration:
+            self.finish()
+
+    def draw(self, surface):
+        surface.fill(WHITE)
+        if self.entries is None:
+            text = render_text(f"Game Over! Time: {self.total_time}s", 48, BLACK)
+            surface.blit(text, (WIDTH//2 - 200, HEIGHT//4))
+            prompt = self.prompt_label.render("Enter team name: " + self.team_name)
+            surface.blit(prompt, (WIDTH//4, HEIGHT//2))
+            return
+
+        title = render_text("Leaderboard:", 48, BLACK)
+        surface.blit(title, (WIDTH//3, HEIGHT//4))
+        y = HEIGHT//3
+        for entry in self.entries:
+            entry_text = render_text(f"{entry['team']}: {entry['score']}s", 48, BLACK)
+            surface.blit(entry_text, (WIDTH//3, y))
+            y += 40
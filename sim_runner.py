@@ -0,0 +1,301 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+import pygame
+
+import layouts
+from constants import TILE_SIZE
+from level_packs import open_level_pack
+from metrics import percentile, scripted_keys
+from simulation import PLAYER1_KEYS, PLAYER2_KEYS, PLAYER_SPEED, SIM_DT, Game, KeyState
+
+# Headless simulation runner for difficulty and balance sweeps.
+# Plays whole games with bot policies instead of keyboards, on the same Game,
+# Level, Player, Rock and Algae code as the real game but without a window,
+# and spreads thousands of seeded games over a multiprocessing pool. The
+# result is a completion-time distribution per stage, written as JSON.
+#
+#   python sim_runner.py --games 2000 --policy greedy --rocks 15 \
+#       --output sim_results.json
+
+DEFAULT_GAMES = 1000
+DEFAULT_MAX_SECONDS = 600  # simulated seconds before a game counts as unfinished
+STAGES = [1, 2, 3]
+FISH_SIZE = (TILE_SIZE + 20, TILE_SIZE + 20)
+
+# Sweep parameters, applied to each worker process by configure()
+DEFAULT_COUNTS = layouts.DIFFICULTIES[layouts.DEFAULT_DIFFICULTY]
+DEFAULT_CONFIG = {
+    "trash_per_color": DEFAULT_COUNTS[1][0],
+    "rocks": DEFAULT_COUNTS[2][1],
+    "algae": DEFAULT_COUNTS[3][1],
+    "speed": PLAYER_SPEED,
+    # Level pack path; its games replace the trash, rocks and algae settings
+    "pack": None,
+}
+
+config = dict(DEFAULT_CONFIG)
+fish_images = None
+level_pack = None
+
+
+def load_fish(path, color):
+    # The real sprite when it is next to the game (for the same collision masks),
+    # a plain ellipse otherwise
+    if os.path.exists(path):
+        image = pygame.image.load(path)
+    else:
+        image = pygame.Surface(FISH_SIZE, pygame.SRCALPHA)
+        pygame.draw.ellipse(image, color, image.get_rect())
+    return pygame.transform.scale(image, FISH_SIZE)
+
+
+def configure(settings):
+    # Pool initializer: each worker keeps its own copy of the settings
+    global fish_images, level_pack
+    config.update(settings)
+    fish_images = (load_fish("redfish.png", (255, 0, 0)),
+                   load_fish("bluefish.png", (0, 0, 255)))
+    level_pack = open_level_pack(config["pack"]) if config["pack"] else None
+
+
+def difficulty_counts():
+    # The configured counts, as a per-stage difficulty mapping (layouts.DIFFICULTIES)
+    per_color = config["trash_per_color"]
+    return {
+        1: (per_color, 0),
+        2: (per_color, config["rocks"]),
+        3: (per_color, config["algae"]),
+    }
+
+
+# Bot policies: keys(game) returns the KeyState for the next tick
+
+# Replays metrics.SCRIPT, the same input bench.py uses
+class ScriptedPolicy:
+    # Same interface as GreedyPolicy; the script needs no randomness
+    def __init__(self, _rng):
+        self.frames = scripted_keys()
+
+    def keys(self, _game):
+        return next(self.frames)
+
+
+# Each fish swims straight at its nearest matching trash; when an obstacle stops
+# it, it picks a random direction for a short detour and then retargets.
+class GreedyPolicy:
+    STUCK_TICKS = 8
+    DETOUR_TICKS = 30
+    DEADZONE = 2  # pixels
+
+    def __init__(self, rng):
+        self.rng = rng
+        # player index -> [last topleft, stuck ticks, detour keys, detour ticks left]
+        self.state = {}
+
+    def _steer(self, game, index, player, key_set):
+        up, down, left, right = key_set
+        state = self.state.setdefault(index, [None, 0, (), 0])
+        moved = player.rect.topleft != state[0]
+        state[0] = player.rect.topleft
+
+        if state[3] > 0:
+            state[3] -= 1
+            return state[2]
+
+        targets = [t for t in game.level.visible_trash()
+                   if t.color == player.trash_color]
+        if not targets:
+            return ()
+        cx, cy = player.rect.center
+        target = min(targets, key=lambda t: (t.rect.centerx - cx) ** 2
+                     + (t.rect.centery - cy) ** 2)
+        dx = target.rect.centerx - cx
+        dy = target.rect.centery - cy
+
+        pressed = []
+        if dx < -self.DEADZONE:
+            pressed.append(left)
+        if dx > self.DEADZONE:
+            pressed.append(right)
+        if dy < -self.DEADZONE:
+            pressed.append(up)
+        if dy > self.DEADZONE:
+            pressed.append(down)
+
+        state[1] = 0 if moved or player.immobilized else state[1] + 1
+        if pressed and state[1] >= self.STUCK_TICKS:
+            state[1] = 0
+            state[2] = self.rng.choice([
+                (up,), (down,), (left,), (right,),
+                (up, left), (up, right), (down, left), (down, right),
+            ])
+            state[3] = self.DETOUR_TICKS
+            return state[2]
+        return pressed
+
+    def keys(self, game):
+        pressed = []
+        key_sets = zip(game.players, (PLAYER1_KEYS, PLAYER2_KEYS), strict=True)
+        for index, (player, key_set) in enumerate(key_sets):
+            pressed.extend(self._steer(game, index, player, key_set))
+        return KeyState(pressed)
+
+
+POLICIES = {"greedy": GreedyPolicy, "scripted": ScriptedPolicy}
+
+
+def simulate(seed, policy="greedy", max_seconds=DEFAULT_MAX_SECONDS):
+    # Plays one game to the end (or max_seconds of game time), returns the stage times
+    if fish_images is None:
+        configure({})
+    game = Game(*fish_images, rng=random.Random(seed), prefetch=False,
+                pack=level_pack, difficulty=difficulty_counts())
+    for player in game.players:
+        player.vel = config["speed"]
+    game.countdown = 0
+    bot = POLICIES[policy](random.Random(seed * 2 + 1))
+
+    max_ticks = int(max_seconds / SIM_DT)
+    stage_ends = []
+    while not game.finished and game.ticks < max_ticks:
+        if game.step(bot.keys(game), SIM_DT):
+            for name, payload in game.pop_events():
+                stage_ends.append(payload if name == "game_over" else game.elapsed)
+
+    # Each stage starts where the previous one ended
+    stage_starts = ([0.0] + stage_ends)[:len(stage_ends)]
+    stage_times = [end - start
+                   for start, end in zip(stage_starts, stage_ends, strict=True)]
+    return {
+        "seed": seed,
+        "finished": game.finished,
+        "elapsed": game.elapsed,
+        "ticks": game.ticks,
+        "stage_times": stage_times,
+    }
+
+
+def distribution(values):
+    values = sorted(values)
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean_s": round(statistics.fmean(values), 3),
+        "min_s": round(values[0], 3),
+        "p50_s": round(percentile(values, 50), 3),
+        "p90_s": round(percentile(values, 90), 3),
+        "p99_s": round(percentile(values, 99), 3),
+        "max_s": round(values[-1], 3),
+    }
+
+
+def aggregate(results):
+    # Stages that were never completed do not count towards that stage's distribution
+    stages = {}
+    for stage in STAGES:
+        times = [r["stage_times"][stage - 1] for r in results
+                 if len(r["stage_times"]) >= stage]
+        stages[stage] = distribution(times)
+    finished = [r["elapsed"] for r in results if r["finished"]]
+    return {
+        "games": len(results),
+        "finished": len(finished),
+        "completion": distribution(finished),
+        "stages": stages,
+    }
+
+
+def _simulate_task(task):
+    return simulate(*task)
+
+
+def run(games, policy="greedy", seed=0, workers=None,
+        max_seconds=DEFAULT_MAX_SECONDS, settings=None):
+    settings = dict(DEFAULT_CONFIG, **(settings or {}))
+    tasks = [(seed + i, policy, max_seconds) for i in range(games)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        configure(settings)
+        return [simulate(*task) for task in tasks]
+    chunksize = max(1, games // (workers * 8))
+    with multiprocessing.Pool(workers, initializer=configure,
+                              initargs=(settings,)) as pool:
+        results = list(pool.imap_unordered(_simulate_task, tasks, chunksize))
+    results.sort(key=lambda r: r["seed"])
+    return results
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Headless game simulations for balance sweeps")
+    parser.add_argument("--games", type=int, default=DEFAULT_GAMES)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="greedy")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes (default: all cores)")
+    parser.add_argument("--max-seconds", type=float, default=DEFAULT_MAX_SECONDS)
+    parser.add_argument("--trash-per-color", type=int,
+                        default=DEFAULT_CONFIG["trash_per_color"])
+    parser.add_argument("--rocks", type=int, default=DEFAULT_CONFIG["rocks"])
+    parser.add_argument("--algae", type=int, default=DEFAULT_CONFIG["algae"])
+    parser.add_argument("--speed", type=float, default=DEFAULT_CONFIG["speed"],
+                        help="Player.vel, pixels per second")
+    parser.add_argument("--pack", default=None,
+                        help="play the games of a level pack (level_packs.py)")
+    parser.add_argument("--output", default="sim_results.json")
+    args = parser.parse_args(argv)
+
+    settings = {
+        "trash_per_color": args.trash_per_color,
+        "rocks": args.rocks,
+        "algae": args.algae,
+        "speed": args.speed,
+        "pack": args.pack,
+    }
+    start = time.perf_counter()
+    results = run(args.games, args.policy, args.seed, args.workers,
+                  args.max_seconds, settings)
+    wall = time.perf_counter() - start
+    summary = aggregate(results)
+
+    simulated = sum(r["ticks"] for r in results) * SIM_DT
+    print(f"{summary['games']} games, {summary['finished']} finished, "
+          f"{simulated:.0f} s simulated in {wall:.1f} s "
+          f"({simulated / wall:.0f}x real time)")
+    for stage, dist in summary["stages"].items():
+        if dist["count"]:
+            print(f"stage {stage}: p50 {dist['p50_s']:.1f} s  "
+                  f"p90 {dist['p90_s']:.1f} s  "
+                  f"p99 {dist['p99_s']:.1f} s  ({dist['count']} games)")
+
+    report = {
+        "meta": {
+            "policy": args.policy,
+            "seed": args.seed,
+            "max_seconds": args.max_seconds,
+            "settings": settings,
+            "python": sys.version.split()[0],
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "wall_seconds": round(wall, 2),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "summary": summary,
+        "games": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,527 @@
+import math
+import random
+
+import pygame
+
+import level_gen
+from assets import get_sprite_variants, get_tile_sprite
+from constants import BLACK, GRAY, GREEN, HEIGHT, ORANGE, TEAL, TILE_SIZE, WIDTH
+from layouts import DEFAULT_DIFFICULTY, LayoutPrefetcher, build_layout, next_level_key
+from obstacle_map import ObstacleMap
+from placement import PlacementGrid
+from profiler import profiler
+from spatial import SpatialHash
+from trash_store import TrashStore
+
+# Game logic, independent of the window: everything here runs on pygame Rects,
+# Masks and Surfaces only, so it can be stepped headless (no display needed).
+
+# Fixed simulation step (seconds) and the longest frame the accumulator will absorb
+SIM_DT = 1 / 60
+MAX_FRAME_TIME = 0.25
+
+PLAYER_SPEED = 180  # pixels per second (3 per tick at 60 Hz)
+IMMOBILIZED_SECONDS = 3
+COUNTDOWN_SECONDS = 3
+# When a step is blocked, keep whichever axis of it is free instead of
+# dropping the whole step
+SLIDE_ALONG_OBSTACLES = False
+
+# Movement keys as (up, down, left, right)
+PLAYER1_KEYS = (pygame.K_w, pygame.K_s, pygame.K_a, pygame.K_d)
+PLAYER2_KEYS = (pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT)
+
+
+# Key-state mapping for driving players without a keyboard (scripted or headless input)
+class KeyState:
+    def __init__(self, pressed=()):
+        self.pressed = set(pressed)
+
+    def __getitem__(self, key):
+        return key in self.pressed
+
+
+# Runs a step function at a fixed rate, however long each rendered frame took.
+# Frame time is accumulated and consumed in SIM_DT slices; a step that returns
+# True (something the presentation must react to) ends the frame early.
+class FixedTimestep:
+    def __init__(self, dt=SIM_DT, max_frame_time=MAX_FRAME_TIME):
+        self.dt = dt
+        self.max_frame_time = max_frame_time
+        self.accumulator = 0.0
+
+    def reset(self):
+        self.accumulator = 0.0
+
+    def advance(self, frame_time, step):
+        self.accumulator += min(frame_time, self.max_frame_time)
+        steps = 0
+        while self.accumulator >= self.dt:
+            self.accumulator -= self.dt
+            steps += 1
+            if step():
+                self.accumulator = 0.0
+                break
+        return steps
+
+
+# Player class with sprite handling
+class Player:
+    def __init__(self, x, y, color, trash_color, image):
+        self.variants = get_sprite_variants(image)
+        self.image, self.mask = self.variants.get(False)
+        self.rect = self.image.get_rect(topleft=(x, y))
+        self.color = color
+        self.trash_color = trash_color
+        self.vel = PLAYER_SPEED
+        self.touching_wrong_trash = False
+        self.immobilized = False
+        self.immobilized_time = 0.0
+        self.facing_right = False
+        self.last_direction = "left"
+
+    def move(self, keys, up, down, left, right, dt, obstacles):
+        if self.immobilized:
+            self.immobilized_time += dt
+            if self.immobilized_time >= IMMOBILIZED_SECONDS:
+                self.immobilized = False
+            return
+
+        dx, dy = 0, 0
+        direction_changed = False
+
+        # Horizontal movement takes priority for facing direction
+        if keys[left]:
+            dx -= 1
+            if self.last_direction != "left" or not keys[right]:
+                self.facing_right = False
+                direction_changed = True
+        if keys[right]:
+            dx += 1
+            if self.last_direction != "right" or not keys[left]:
+                self.facing_right = True
+                direction_changed = True
+
+        # Vertical movement
+        if keys[up]:
+            dy -= 1
+        if keys[down]:
+            dy += 1
+
+        # Update image based on direction
+        if direction_changed:
+            self.image, self.mask = self.variants.get(self.facing_right)
+
+        # Update last direction
+        if dx != 0:
+            self.last_direction = "right" if dx > 0 else "left"
+
+        if dx != 0 or dy != 0:
+            length = math.hypot(dx, dy)
+            dx, dy = dx/length, dy/length
+            new_x = self.rect.x + dx * self.vel * dt
+            new_y = self.rect.y + dy * self.vel * dt
+
+            # Create temp rect for collision checking
+            temp_rect = self.image.get_rect(topleft=(new_x, new_y))
+
+            # Keep within screen bounds
+            if temp_rect.left < 0:
+                new_x = 0
+            if temp_rect.right > WIDTH:
+                new_x = WIDTH - temp_rect.width
+            if temp_rect.top < 0:
+                new_y = 0
+            if temp_rect.bottom > HEIGHT:
+                new_y = HEIGHT - temp_rect.height
+
+            # Check collisions with rocks: one lookup in the obstacle map
+            if not obstacles.hits_rect(temp_rect):
+                self.rect.topleft = (new_x, new_y)
+            elif SLIDE_ALONG_OBSTACLES:
+                vertical = temp_rect.move(self.rect.x - temp_rect.x, 0)
+                horizontal = temp_rect.move(0, self.rect.y - temp_rect.y)
+                if not obstacles.hits_rect(vertical):
+                    self.rect.y = new_y
+                elif not obstacles.hits_rect(horizontal):
+                    self.rect.x = new_x
+
+    def immobilize(self):
+        self.immobilized = True
+        self.immobilized_time = 0.0
+
+# Trash class with mask
+# Entities are small records (position + state); the surface and mask are
+# shared flyweights.
+class Trash:
+    __slots__ = ("rect", "color", "collected", "sprite", "index")
+
+    def __init__(self, color, topleft):
+        self.sprite = get_tile_sprite("ellipse", color, TILE_SIZE)
+        self.rect = pygame.Rect(topleft, (TILE_SIZE, TILE_SIZE))
+        self.color = color
+        self.collected = False
+        self.index = -1
+
+    @property
+    def image(self):
+        return self.sprite[0]
+
+    @property
+    def mask(self):
+        return self.sprite[1]
+
+
+# Rock class with mask
+class Rock:
+    __slots__ = ("rect", "sprite")
+
+    def __init__(self, topleft):
+        self.sprite = get_tile_sprite("block", GRAY, TILE_SIZE)
+        self.rect = pygame.Rect(topleft, (TILE_SIZE, TILE_SIZE))
+
+    @property
+    def image(self):
+        return self.sprite[0]
+
+    @property
+    def mask(self):
+        return self.sprite[1]
+
+    def draw(self, surface):
+        surface.blit(self.image, self.rect)
+
+# Algae class with mask
+class Algae:
+    __slots__ = ("rect", "sprite")
+
+    def __init__(self, topleft):
+        self.sprite = get_tile_sprite("block", GREEN, TILE_SIZE)
+        self.rect = pygame.Rect(topleft, (TILE_SIZE, TILE_SIZE))
+
+    @property
+    def image(self):
+        return self.sprite[0]
+
+    @property
+    def mask(self):
+        return self.sprite[1]
+
+    def draw(self, surface):
+        surface.blit(self.image, self.rect)
+
+
+# Level class with 3 levels per stage
+# `trash` is the precomputed (color, topleft) list from the level's layout.
+class Level:
+    def __init__(self, game, stage, level_num, trash=()):
+        self.game = game
+        self.stage = stage
+        self.level_num = level_num
+        # Trash records for drawing and collisions; positions, colors, flags and
+        # counters live in the store
+        self.trashes = []
+        self.store = TrashStore([ORANGE, TEAL], TILE_SIZE)
+        # Broadphase index over uncollected trash ids
+        self.grid = SpatialHash(TILE_SIZE * 2)
+
+        # Create non-overlapping trash
+        spots = game.claim_cells([topleft for _, topleft in trash])
+        for (color, _), topleft in zip(trash, spots, strict=True):
+            if topleft is None:
+                break  # Board full
+            self._append(Trash(color, topleft))
+
+    @property
+    def required_orange(self):
+        return self.store.total(ORANGE)
+
+    @property
+    def required_teal(self):
+        return self.store.total(TEAL)
+
+    @property
+    def remaining(self):
+        return self.store.remaining
+
+    def collected_count(self, color):
+        return self.store.collected_count(color)
+
+    def _append(self, trash):
+        trash.index = self.store.add(trash.rect.x, trash.rect.y, trash.color)
+        self.trashes.append(trash)
+        self.grid.insert(trash.index, trash.rect)
+
+    def add_trash(self, color):
+        topleft = self.game.find_free_spot()
+        if topleft is None:
+            return False  # Board full, no penalty trash
+        self._append(Trash(color, topleft))
+        return True
+
+    def place_trash(self, color, topleft):
+        # Adds trash at an exact spot, which may overlap other things (bench.py's
+        # stress levels). Its cells are still occupied, so collecting it later
+        # releases only what it took.
+        trash = Trash(color, topleft)
+        self.game.placement.occupy(trash.rect)
+        self._append(trash)
+        return trash
+
+    def collect(self, trash):
+        trash.collected = True
+        self.store.collect(trash.index)
+        self.grid.remove(trash.index)
+        self.game.placement.release(trash.rect)
+
+    def nearby_trash(self, rect):
+        # Uncollected trash overlapping rect: grid cells under rect, then a
+        # vectorized AABB test
+        ids = self.store.overlapping(rect, self.grid.query(rect))
+        return [self.trashes[i] for i in ids]
+
+    def visible_trash(self):
+        return [self.trashes[i] for i in self.store.uncollected()]
+
+
+# Collision detection functions
+def check_mask_collision(sprite1, sprite2):
+    offset_x = sprite2.rect.x - sprite1.rect.x
+    offset_y = sprite2.rect.y - sprite1.rect.y
+    return sprite1.mask.overlap(sprite2.mask, (offset_x, offset_y)) is not None
+
+
+# Whole game state plus the fixed-step update.
+# step() advances one tick of dt seconds; things the presentation has to show
+# (stage banners, game over) are queued in `events` as (name, payload) tuples.
+# `difficulty` sets how much trash and how many obstacles the levels get
+# (layouts.DIFFICULTIES). With a LevelPack (level_packs.py) the levels come from
+# one of its games, picked with rng, instead of being laid out while playing.
+class Game:
+    def __init__(self, red_image, blue_image, rng=random, prefetch=True, pack=None,
+                 difficulty=DEFAULT_DIFFICULTY):
+        self.rng = rng
+        self.difficulty = difficulty
+        self.placement = PlacementGrid(WIDTH, HEIGHT, TILE_SIZE, rng)
+        # Lays out the next level in the background while the current one is played
+        self.prefetcher = LayoutPrefetcher(rng, threaded=prefetch,
+                                           difficulty=difficulty)
+        self.pack_layouts = None
+        self.pack_game_id = 0  # LevelPack.game_id of the game played, 0 without a pack
+        if pack:
+            index = rng.randrange(len(pack))
+            self.pack_layouts = pack.layouts(index)
+            self.pack_game_id = pack.game_id(index)
+        self.stage = 1
+        self.level_num = 1
+        self.rocks = []
+        self.algae_list = []
+        # Free cells the fish cannot collect from (walled in by rocks);
+        # trash never goes there
+        self.dead_cells = []
+        # Rocks and algae baked into playfield bitmaps when a stage sets them up
+        self.rock_map = ObstacleMap(WIDTH, HEIGHT)
+        self.algae_map = ObstacleMap(WIDTH, HEIGHT)
+        self.player1 = Player(100, HEIGHT-100, (255,0,0), ORANGE, red_image)
+        self.player2 = Player(200, HEIGHT-100, (0,0,255), TEAL, blue_image)
+        self.players = [self.player1, self.player2]
+        self.level = None
+        self.start_level(self.take_layout())
+        self.ticks = 0
+        self.elapsed = 0.0  # Gameplay time, countdowns excluded
+        self.countdown = COUNTDOWN_SECONDS
+        self.finished = False
+        self.events = []
+        # Optional InputRecorder (replay.py): gets every tick's keys and
+        # countdown restarts
+        self.recorder = None
+
+    @property
+    def started(self):
+        return self.countdown <= 0
+
+    def countdown_display(self):
+        # Whole seconds left on the countdown, as shown on screen (3, 2, 1)
+        return math.ceil(self.countdown)
+
+    def restart_countdown(self):
+        self.countdown = COUNTDOWN_SECONDS
+        if self.recorder is not None:
+            self.recorder.restart_countdown()
+
+    def step(self, keys, dt=SIM_DT):
+        # Returns True when events were queued for the presentation
+        if self.finished:
+            return False
+        if self.recorder is not None:
+            self.recorder.tick(keys)
+        self.ticks += 1
+        if self.countdown > 0:
+            self.countdown -= dt
+            return False
+
+        self.elapsed += dt
+        self.player1.move(keys, *PLAYER1_KEYS, dt, self.rock_map)
+        self.player2.move(keys, *PLAYER2_KEYS, dt, self.rock_map)
+        profiler.mark("move")
+
+        # Check collisions and collections
+        self.check_wrong_trash_collisions()
+        profiler.mark("wrong_trash")
+        if self.stage == 3:
+            self.check_algae_collisions()
+            profiler.mark("algae")
+        self.check_collections()
+        profiler.mark("collections")
+        return bool(self.events)
+
+    # Spawning: every entity gets a free cell from the placement grid, away
+    # from the players.
+    # Returns None when the board is full.
+    def find_free_spot(self):
+        rect = self.placement.place(avoid=[self.player1.rect, self.player2.rect])
+        return rect.topleft if rect is not None else None
+
+    # Level transitions: swap in the prefetched layout, then start laying out
+    # the next level
+    def obstacle_cells(self):
+        return [obstacle.rect.topleft for obstacle in self.rocks + self.algae_list]
+
+    def rock_cells(self):
+        return [rock.rect.topleft for rock in self.rocks]
+
+    def take_layout(self):
+        if self.pack_layouts is not None:
+            layout = self.pack_layouts[(self.stage, self.level_num)]
+        else:
+            layout = self.prefetcher.take(self.stage, self.level_num)
+        if layout is None:
+            # Nothing prefetched for this level (first level, or stages skipped by hand)
+            layout = build_layout(self.stage, self.level_num,
+                                  self.obstacle_cells(), self.rock_cells(),
+                                  self.rng.getrandbits(64), self.difficulty)
+
+        # Trash from the previous level is gone; only obstacles stay on the board
+        self.placement.reset()
+        for obstacle in self.rocks + self.algae_list:
+            self.placement.occupy(obstacle.rect)
+        self._occupy_dead_cells()
+        return layout
+
+    def _occupy_dead_cells(self):
+        for cell in self.dead_cells:
+            topleft = level_gen.to_topleft(cell)
+            self.placement.occupy(pygame.Rect(topleft, (TILE_SIZE, TILE_SIZE)))
+
+    def claim_cells(self, cells):
+        # Occupies precomputed cells. The layout was made without knowing where the
+        # players would be, so cells under a player are swapped for a free spot now,
+        # as are cells taken since (a rock that had to move, cells no fish can reach).
+        # Returns one topleft per cell, None where the board is full.
+        spots = []
+        moved = []
+        for topleft in cells:
+            rect = pygame.Rect(topleft, (TILE_SIZE, TILE_SIZE))
+            under_player = (rect.colliderect(self.player1.rect)
+                            or rect.colliderect(self.player2.rect))
+            if under_player or not self.placement.is_free(rect):
+                moved.append(len(spots))
+                spots.append(None)
+            else:
+                self.placement.occupy(rect)
+                spots.append(topleft)
+        for i in moved:
+            spots[i] = self.find_free_spot()
+        return spots
+
+    def place_obstacles(self, cls, cells):
+        spots = self.claim_cells(cells)
+        return [cls(topleft) for topleft in spots if topleft is not None]
+
+    def start_level(self, layout):
+        self.level = Level(self, self.stage, self.level_num, layout.trash)
+        key = next_level_key(self.stage, self.level_num)
+        if key is not None and self.pack_layouts is None:
+            self.prefetcher.schedule(*key, self.obstacle_cells(), self.rock_cells())
+
+    def check_wrong_trash_collisions(self):
+        for player in self.players:
+            current_touching = False
+            for trash in self.level.nearby_trash(player.rect):
+                wrong = trash.color != player.trash_color
+                if wrong and check_mask_collision(player, trash):
+                    current_touching = True
+                    if not player.touching_wrong_trash:
+                        # Add 2 new pieces of the player's trash
+                        for _ in range(2):
+                            self.level.add_trash(player.trash_color)
+                        player.touching_wrong_trash = True
+            if not current_touching:
+                player.touching_wrong_trash = False
+
+    def check_algae_collisions(self):
+        for player in self.players:
+            # One overlap against all algae before looking for the ones that were hit
+            if not self.algae_map.hits_mask(player.mask, player.rect.topleft):
+                continue
+            for algae in self.algae_list[:]:  # Iterate over a copy of the list
+                if check_mask_collision(player, algae):
+                    player.immobilize()
+                    player.color = BLACK  # Turn player black
+                    self.algae_list.remove(algae)  # Remove algae from the screen
+                    self.algae_map.remove(algae.rect)
+                    self.placement.release(algae.rect)
+
+    def check_collections(self):
+        all_collected = self.level.remaining == 0
+        for player in self.players:
+            for trash in self.level.nearby_trash(player.rect):
+                right = trash.color == player.trash_color
+                if right and check_mask_collision(player, trash):
+                    self.level.collect(trash)
+
+        if all_collected:
+            self.next_level()
+
+    def next_level(self):
+        self.level_num += 1
+        if self.level_num <= 3:  # 3 levels per stage
+            self.start_level(self.take_layout())
+        else:
+            self.next_stage()
+
+    def next_stage(self):
+        self.stage += 1
+        self.level_num = 1
+        if self.stage > 3:
+            self.finished = True
+            self.events.append(("game_over", self.elapsed))
+            return
+        layout = self.take_layout()
+        if self.stage == 2:
+            self.events.append(("stage_complete", "Stage 1 Complete. Onto Stage 2..."))
+            # Add rocks for Stage 2
+            self.rocks = self.place_obstacles(Rock, layout.obstacles)
+            self.open_board()
+            self.rock_map.rebuild(rock.rect for rock in self.rocks)
+        elif self.stage == 3:
+            self.events.append(("stage_complete", "Stage 2 Complete. Onto Stage 3..."))
+            # Add algae for Stage 3
+            self.algae_list = self.place_obstacles(Algae, layout.obstacles)
+            self.algae_map.rebuild(algae.rect for algae in self.algae_list)
+        self.start_level(layout)
+
+    def open_board(self):
+        # A rock moved out from under a player can wall off part of the board:
+        # drop rocks until the fish can reach everywhere again, then keep trash
+        # off the cells no fish can collect from
+        rocks = [level_gen.to_cell(topleft) for topleft in self.rock_cells()]
+        while self.rocks and level_gen.open_area(rocks) is None:
+            self.placement.release(self.rocks.pop().rect)
+            rocks.pop()
+        self.dead_cells = level_gen.dead_cells(rocks)
+        self._occupy_dead_cells()
+
+    def pop_events(self):
+        events, self.events = self.events, []
+        return events
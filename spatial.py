@@ -0,0 +1,52 @@
+# Uniform-grid spatial hash used as a broadphase for collision checks.
+# Items are bucketed by the grid cells their rect covers, so a query only
+# touches the cells under the query rect instead of every item.
+class SpatialHash:
+    def __init__(self, cell_size):
+        self.cell_size = int(cell_size)
+        self.cells = {}
+        self.item_cells = {}
+
+    def _cells_for(self, rect):
+        cs = self.cell_size
+        x0, y0 = int(rect.left) // cs, int(rect.top) // cs
+        x1, y1 = (int(rect.right) - 1) // cs, (int(rect.bottom) - 1) // cs
+        return [(cx, cy) for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1)]
+
+    def insert(self, item, rect):
+        if item in self.item_cells:
+            self.remove(item)
+        keys = self._cells_for(rect)
+        for key in keys:
+            self.cells.setdefault(key, {})[item] = None
+        self.item_cells[item] = keys
+
+    def remove(self, item):
+        keys = self.item_cells.pop(item, None)
+        if keys is None:
+            return
+        for key in keys:
+            bucket = self.cells[key]
+            del bucket[item]
+            if not bucket:
+                del self.cells[key]
+
+    def query(self, rect):
+        # Returns a fresh list (in insertion order per cell), safe to iterate while
+        # the hash changes
+        found = {}
+        for key in self._cells_for(rect):
+            bucket = self.cells.get(key)
+            if bucket:
+                found.update(bucket)
+        return list(found)
+
+    def clear(self):
+        self.cells.clear()
+        self.item_cells.clear()
+
+    def __len__(self):
+        return len(self.item_cells)
+
+    def __contains__(self, item):
+        return item in self.item_cells
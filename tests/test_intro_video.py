@@ -0,0 +1,88 @@
+import errno
+import io
+import os
+
+import pygame
+import pytest
+
+import intro_video
+from intro_video import FrameCacheWriter, open_frame_cache
+
+SIZE = (8, 6)
+
+
+@pytest.fixture
+def video(tmp_path, monkeypatch):
+    # The writer only stats the source video, so any file will do
+    monkeypatch.chdir(tmp_path)
+    path = tmp_path / "intro.mp4"
+    path.write_bytes(b"not really a video")
+    return str(path)
+
+
+def frame(value):
+    surface = pygame.Surface(SIZE)
+    surface.fill((value, value, value))
+    return surface
+
+
+def test_finished_cache_is_published(video):
+    with FrameCacheWriter(video, SIZE, 24.0) as writer:
+        for value in (10, 20, 30):
+            writer.write(frame(value))
+        writer.finish()
+    cached = open_frame_cache(video, SIZE)
+    assert cached.frame_count == 3
+    cached.start()
+    assert cached.frame_at(1 / 24).get_at((0, 0))[:3] == (20, 20, 20)
+    assert not os.path.exists(writer.tmp_path)
+
+
+def test_unfinished_cache_is_deleted(video):
+    with FrameCacheWriter(video, SIZE, 24.0) as writer:
+        writer.write(frame(10))
+    assert open_frame_cache(video, SIZE) is None
+    assert not os.path.exists(writer.tmp_path)
+
+
+def test_unwritable_cache_dir_is_skipped(video, monkeypatch):
+    # A file where the cache directory should be, like a read-only install
+    open("blocked", "w").close()
+    monkeypatch.setattr(intro_video, "CACHE_DIR", os.path.join("blocked", "cache"))
+    with FrameCacheWriter(video, SIZE, 24.0) as writer:
+        assert not writer.active
+        writer.write(frame(10))
+        writer.finish()
+    assert open_frame_cache(video, SIZE) is None
+
+
+class FullDisk(io.BytesIO):
+    def write(self, _data):
+        raise OSError(errno.ENOSPC, "No space left on device")
+
+
+def test_write_error_abandons_the_cache(video):
+    with FrameCacheWriter(video, SIZE, 24.0) as writer:
+        writer.file.close()
+        writer.file = FullDisk()
+        writer.write(frame(10))
+        assert not writer.active
+        writer.write(frame(20))  # Further frames are dropped quietly
+        writer.finish()
+    assert open_frame_cache(video, SIZE) is None
+    assert not os.path.exists(writer.tmp_path)
+
+
+def test_second_writer_leaves_the_first_alone(video):
+    with FrameCacheWriter(video, SIZE, 24.0) as first:
+        first.write(frame(10))
+        with FrameCacheWriter(video, SIZE, 24.0) as second:
+            assert not second.active
+            second.finish()
+        assert os.path.exists(first.tmp_path)
+        first.write(frame(20))
+        first.finish()
+    assert open_frame_cache(video, SIZE).frame_count == 2
+
+    with FrameCacheWriter(video, SIZE, 24.0) as again:  # The path is free again
+        assert again.active
@@ -0,0 +1,33 @@
+import random
+
+import pytest
+
+from layouts import LayoutPrefetcher, build_layout
+
+# Stage 2 starts with rocks, so the layout depends on both the obstacles already
+# on the board and the ones it adds
+OCCUPIED = [(0, 0), (120, 60)]
+BLOCKED = [(120, 60)]
+
+
+def as_tuples(layout):
+    return (layout.stage, layout.level_num, list(layout.obstacles), list(layout.trash))
+
+
+@pytest.mark.parametrize("threaded", [True, False])
+@pytest.mark.parametrize("difficulty", ["easy", "hard"])
+def test_prefetched_layout_matches_an_inline_one(threaded, difficulty):
+    prefetcher = LayoutPrefetcher(random.Random(4), threaded, difficulty)
+    prefetcher.schedule(2, 1, OCCUPIED, BLOCKED)
+    prefetched = prefetcher.take(2, 1)
+
+    seed = random.Random(4).getrandbits(64)
+    inline = build_layout(2, 1, OCCUPIED, BLOCKED, seed, difficulty)
+    assert as_tuples(prefetched) == as_tuples(inline)
+
+
+def test_other_level_is_not_handed_out():
+    prefetcher = LayoutPrefetcher(random.Random(4), threaded=False)
+    prefetcher.schedule(2, 1, OCCUPIED, BLOCKED)
+    assert prefetcher.take(2, 2) is None
+    assert prefetcher.take(2, 1) is None  # The job was dropped
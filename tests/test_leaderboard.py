@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from leaderboard import Leaderboard
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / "leaderboard.db"), str(tmp_path / "leaderboard.json")
+
+
+def write_json(path, value):
+    with open(path, "w") as f:
+        json.dump(value, f)
+
+
+def test_top_orders_by_time_then_insertion(paths):
+    board = Leaderboard(paths[0])
+    for team, score in (("slow", 30.0), ("first", 12.5), ("second", 12.5)):
+        board.add(team, score)
+    assert board.top(2) == [{"team": "first", "score": 12.5},
+                            {"team": "second", "score": 12.5}]
+    assert len(board) == 3
+    board.close()
+
+
+def test_legacy_json_is_imported_once(paths):
+    db, legacy = paths
+    write_json(legacy, [{"team": "a", "score": 20}, {"team": "b", "score": 10}])
+    Leaderboard(db, legacy_json=legacy).close()
+
+    board = Leaderboard(db, legacy_json=legacy)
+    assert board.top() == [{"team": "b", "score": 10.0}, {"team": "a", "score": 20.0}]
+    assert board.import_json(legacy) == 0
+    board.close()
+
+
+def test_missing_legacy_file_counts_as_imported(paths):
+    db, legacy = paths
+    board = Leaderboard(db, legacy_json=legacy)
+    write_json(legacy, [{"team": "late", "score": 1}])
+    assert board.import_json(legacy) == 0
+    assert len(board) == 0
+    board.close()
+
+
+def test_unusable_entries_are_skipped(paths):
+    db, legacy = paths
+    write_json(legacy, [
+        {"team": "ok", "score": "15.5"},
+        {"team": "text", "score": "fast"},
+        {"team": "null", "score": None},
+        {"team": "nan", "score": "nan"},
+        {"team": "no score"},
+        ["not", "an", "entry"],
+        {"score": 3},
+    ])
+    board = Leaderboard(db)
+    assert board.import_json(legacy) == 2
+    assert board.top() == [{"team": "", "score": 3.0}, {"team": "ok", "score": 15.5}]
+    board.close()
+
+
+@pytest.mark.parametrize("content", ['{"team": "a", "score": 1}', "[{"])
+def test_bad_file_is_left_for_a_later_import(paths, content):
+    db, legacy = paths
+    with open(legacy, "w") as f:
+        f.write(content)
+    board = Leaderboard(db, legacy_json=legacy)
+    assert len(board) == 0
+
+    write_json(legacy, [{"team": "fixed", "score": 5}])
+    assert board.import_json(legacy) == 1
+    board.close()
@@ -0,0 +1,72 @@
+import random
+
+import level_gen
+from level_gen import (
+    COLS,
+    ROWS,
+    all_cells,
+    dead_cells,
+    open_area,
+    spread_cells,
+    spread_rocks,
+)
+
+
+def test_spread_cells_keeps_the_radius():
+    cells = spread_cells(random.Random(0), all_cells(), 10, radius=4)
+    assert len(cells) == 10
+    assert len(set(cells)) == 10
+    for i, (x, y) in enumerate(cells):
+        for cx, cy in cells[i + 1:]:
+            assert (x - cx) ** 2 + (y - cy) ** 2 >= 16
+
+
+def test_spread_cells_shrinks_the_radius_to_fit():
+    candidates = [(x, 0) for x in range(5)]
+    cells = spread_cells(random.Random(0), candidates, 5, radius=10)
+    assert sorted(cells) == candidates
+
+
+def test_spread_cells_stops_at_the_candidates():
+    assert len(spread_cells(random.Random(0), [(0, 0), (5, 5)], 10)) == 2
+
+
+def test_empty_board_is_one_open_area():
+    area = open_area([])
+    assert area is not None
+    assert all(area)
+    assert dead_cells([]) == []
+
+
+def test_wall_across_the_board_is_detected():
+    wall = [(x, ROWS // 2) for x in range(COLS)]
+    assert open_area(wall) is None
+
+
+def test_one_tile_gap_is_too_narrow_for_a_fish():
+    row = ROWS // 2
+    wall = [(x, row) for x in range(COLS) if x != COLS // 2]
+    assert open_area(wall) is None
+    wider = [(x, row) for x in range(COLS) if x not in (COLS // 2, COLS // 2 + 1)]
+    assert open_area(wider) is not None
+
+
+def test_cell_boxed_in_by_rocks_is_dead():
+    # A free cell in the corner whose only neighbours are rocks
+    rocks = [(1, 0), (0, 1), (1, 1)]
+    assert (0, 0) in dead_cells(rocks)
+
+
+def test_corner_cell_is_collectable():
+    area = open_area([])
+    assert level_gen.collectable(area, (0, 0))
+    assert level_gen.collectable(area, (COLS - 1, ROWS - 1))
+
+
+def test_spread_rocks_never_walls_off_the_board():
+    rng = random.Random(3)
+    rocks = []
+    for _ in range(3):
+        free = [cell for cell in all_cells() if cell not in rocks]
+        rocks += spread_rocks(rng, free, 25, rocks)
+        assert open_area(rocks) is not None
@@ -0,0 +1,94 @@
+import struct
+
+import pytest
+
+import level_packs
+from constants import ORANGE, TEAL
+from level_packs import (
+    LevelPack,
+    generate_game,
+    level_keys,
+    open_level_pack,
+    write_pack,
+)
+
+
+def as_tuples(layout):
+    return (layout.stage, layout.level_num, list(layout.obstacles), list(layout.trash))
+
+
+def test_level_keys_start_at_the_first_level():
+    keys = level_keys()
+    assert keys[0] == (1, 1)
+    assert len(keys) == len(set(keys))
+
+
+def test_generate_game_is_seeded():
+    first = [as_tuples(layout) for layout in generate_game(7)]
+    assert first == [as_tuples(layout) for layout in generate_game(7)]
+    assert first != [as_tuples(layout) for layout in generate_game(8)]
+
+
+def test_difficulty_sets_the_counts():
+    for name, counts in level_packs.layouts.DIFFICULTIES.items():
+        for layout in generate_game(0, name):
+            per_color, obstacles = counts[layout.stage]
+            assert len(layout.trash) == 2 * per_color
+            assert len(layout.obstacles) <= obstacles
+
+
+def test_pack_round_trip(tmp_path):
+    path = str(tmp_path / "packs" / "test.ocl")
+    games = [generate_game(seed, "hard") for seed in range(3)]
+    write_pack(path, games)
+
+    pack = LevelPack(path)
+    assert len(pack) == 3
+    for index, game in enumerate(games):
+        decoded = pack.layouts(index)
+        assert list(decoded) == level_keys()
+        assert [as_tuples(layout) for layout in decoded.values()] == \
+            [as_tuples(layout) for layout in game]
+
+
+def test_both_trash_colors_survive_encoding(tmp_path):
+    path = str(tmp_path / "test.ocl")
+    game = generate_game(1)
+    write_pack(path, [game])
+    colors = {color for layout in LevelPack(path).layouts(0).values()
+              for color, _ in layout.trash}
+    assert colors == {ORANGE, TEAL}
+
+
+def test_open_level_pack_reads_the_environment(tmp_path, monkeypatch):
+    monkeypatch.delenv(level_packs.PACK_ENV, raising=False)
+    assert open_level_pack() is None
+    path = str(tmp_path / "test.ocl")
+    write_pack(path, [generate_game(0)])
+    monkeypatch.setenv(level_packs.PACK_ENV, path)
+    assert len(open_level_pack()) == 1
+
+
+def header(**fields):
+    values = {"magic": level_packs.PACK_MAGIC, "version": level_packs.PACK_VERSION,
+              "tile_size": level_packs.TILE_SIZE, "cols": level_packs.level_gen.COLS,
+              "rows": level_packs.level_gen.ROWS, "levels": len(level_keys()),
+              "games": 1}
+    values.update(fields)
+    return level_packs.PACK_HEADER.pack(*values.values())
+
+
+@pytest.mark.parametrize("content, message", [
+    (b"OCLP", "not a level pack"),
+    (header(magic=b"XXXX"), "not a version"),
+    (header(version=level_packs.PACK_VERSION + 1), "not a version"),
+    (header(cols=1), "different board"),
+    (header(levels=1), "different board"),
+    (header(games=0), "no games"),
+    (header() + struct.pack("<I", 0), "cut short"),
+])
+def test_rejects_bad_packs(tmp_path, content, message):
+    path = tmp_path / "bad.ocl"
+    path.write_bytes(content)
+    with pytest.raises(ValueError, match=message):
+        LevelPack(str(path))
@@ -0,0 +1,23 @@
+import itertools
+
+import pytest
+
+from metrics import SCRIPT, percentile, scripted_keys
+from replay import key_mask
+
+
+@pytest.mark.parametrize("pct, expected", [(0, 1), (20, 1), (50, 3), (90, 5), (100, 5)])
+def test_percentile_is_nearest_rank(pct, expected):
+    assert percentile([1, 2, 3, 4, 5], pct) == expected
+
+
+def test_percentile_of_nothing():
+    assert percentile([], 50) == 0.0
+
+
+def test_scripted_keys_follow_the_script_and_repeat():
+    length = sum(ticks for ticks, _, _ in SCRIPT)
+    masks = [key_mask(keys) for keys in itertools.islice(scripted_keys(), 2 * length)]
+    assert masks[:length] == masks[length:]
+    assert len(set(masks[:SCRIPT[0][0]])) == 1
+    assert masks[SCRIPT[0][0] - 1] != masks[SCRIPT[0][0]]
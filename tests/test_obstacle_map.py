@@ -0,0 +1,58 @@
+import pygame
+
+from obstacle_map import ObstacleMap
+
+
+def test_empty_map_hits_nothing():
+    obstacles = ObstacleMap(200, 200)
+    assert not obstacles.hits_rect(pygame.Rect(0, 0, 200, 200))
+
+
+def test_hits_rect_matches_colliderect():
+    rock = pygame.Rect(40, 40, 40, 40)
+    obstacles = ObstacleMap(200, 200)
+    obstacles.add(rock)
+    for rect in (pygame.Rect(0, 0, 41, 41), pygame.Rect(0, 0, 40, 40),
+                 pygame.Rect(79, 79, 30, 30), pygame.Rect(80, 40, 30, 30),
+                 pygame.Rect(50, 50, 5, 5)):
+        assert obstacles.hits_rect(rect) == rock.colliderect(rect), rect
+
+
+def test_rect_partly_off_the_board():
+    obstacles = ObstacleMap(200, 200)
+    obstacles.add(pygame.Rect(0, 0, 40, 40))
+    assert obstacles.hits_rect(pygame.Rect(-20, -20, 30, 30))
+    assert not obstacles.hits_rect(pygame.Rect(190, 190, 30, 30))
+
+
+def test_remove_keeps_neighbours():
+    left = pygame.Rect(0, 0, 40, 40)
+    right = pygame.Rect(40, 0, 40, 40)
+    obstacles = ObstacleMap(200, 200)
+    obstacles.rebuild([left, right])
+    obstacles.remove(left)
+    assert not obstacles.hits_rect(left)
+    assert obstacles.hits_rect(right)
+    assert obstacles.count == 1
+
+
+def test_hits_mask_uses_sprite_shape():
+    obstacles = ObstacleMap(200, 200)
+    obstacles.add(pygame.Rect(40, 40, 40, 40))
+    # A sprite whose only set pixel is its bottom-right corner
+    sprite = pygame.mask.Mask((20, 20))
+    sprite.set_at((19, 19))
+    assert obstacles.hits_mask(sprite, (25, 25))
+    assert not obstacles.hits_mask(sprite, (15, 15))
+
+
+def test_every_edit_changes_the_version():
+    obstacles = ObstacleMap(200, 200)
+    other = ObstacleMap(200, 200)
+    seen = {obstacles.version, other.version}
+    rect = pygame.Rect(0, 0, 40, 40)
+    for edit in (lambda: obstacles.add(rect), lambda: obstacles.remove(rect),
+                 obstacles.clear):
+        edit()
+        assert obstacles.version not in seen
+        seen.add(obstacles.version)
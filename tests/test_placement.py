@@ -0,0 +1,55 @@
+import random
+
+import pygame
+
+from placement import PlacementGrid
+
+
+def test_place_fills_every_cell_once_then_reports_full():
+    grid = PlacementGrid(120, 80, 40, rng=random.Random(0))
+    placed = [grid.place() for _ in range(6)]
+    assert len({tuple(rect) for rect in placed}) == 6
+    assert all(rect.w == rect.h == 40 for rect in placed)
+    assert grid.is_full()
+    assert grid.place() is None
+
+
+def test_release_frees_a_cell_again():
+    grid = PlacementGrid(80, 40, 40, rng=random.Random(0))
+    first = grid.place()
+    grid.place()
+    grid.release(first)
+    assert grid.is_free(first)
+    assert grid.place() == first
+
+
+def test_overlapping_occupants_are_counted():
+    grid = PlacementGrid(80, 80, 40)
+    rect = pygame.Rect(0, 0, 40, 40)
+    grid.occupy(rect)
+    grid.occupy(rect)
+    grid.release(rect)
+    assert not grid.is_free(rect)
+    grid.release(rect)
+    assert grid.is_free(rect)
+
+
+def test_release_of_free_cell_is_ignored():
+    grid = PlacementGrid(80, 80, 40)
+    grid.release(pygame.Rect(0, 0, 40, 40))
+    assert len(grid.free) == 4
+
+
+def test_avoid_only_applies_to_one_call():
+    grid = PlacementGrid(80, 40, 40, rng=random.Random(0))
+    player = pygame.Rect(0, 0, 40, 40)
+    assert grid.place(avoid=[player]) == pygame.Rect(40, 0, 40, 40)
+    assert grid.is_free(player)
+    assert grid.place(avoid=[player]) is None
+
+
+def test_rect_spanning_cells_occupies_all_of_them():
+    grid = PlacementGrid(120, 120, 40)
+    grid.occupy(pygame.Rect(20, 20, 60, 60))  # Covers the top-left 2x2 cells
+    assert len(grid.free) == 9 - 4
+    assert grid.is_free(pygame.Rect(80, 80, 40, 40))
@@ -0,0 +1,26 @@
+import logging
+
+import pytest
+
+from render_backend import RENDER_SCALE_ENV, parse_display_mode, parse_render_scale
+
+
+def test_parse_display_mode():
+    assert parse_display_mode(None) == (None, False)
+    assert parse_display_mode("Fullscreen") == (None, True)
+    assert parse_display_mode("1280x720") == ((1280, 720), False)
+    with pytest.raises(ValueError, match="WIDTHxHEIGHT"):
+        parse_display_mode("big")
+
+
+@pytest.mark.parametrize("value, scale", [(None, 1.0), ("", 1.0), ("0.5", 0.5),
+                                          ("1", 1.0)])
+def test_parse_render_scale(value, scale):
+    assert parse_render_scale(value) == scale
+
+
+@pytest.mark.parametrize("value", ["half", "0", "-0.5", "1.5", "nan", "inf"])
+def test_unusable_render_scale_falls_back_to_full(value, caplog):
+    with caplog.at_level(logging.WARNING):
+        assert parse_render_scale(value) == 1.0
+    assert RENDER_SCALE_ENV in caplog.text
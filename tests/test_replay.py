@@ -0,0 +1,162 @@
+import io
+import random
+
+import pygame
+import pytest
+
+import replay
+from constants import TILE_SIZE
+from level_packs import LevelPack, generate_game, write_pack
+from replay import InputRecorder, ReplayPlayer, key_mask, mask_keys
+from simulation import Game
+
+
+# Stands in for Game: logs the key mask of every tick and countdown restarts
+class LoggingGame:
+    def __init__(self):
+        self.log = []
+
+    def step(self, keys):
+        self.log.append(key_mask(keys))
+        return False
+
+    def restart_countdown(self):
+        self.log.append("restart")
+
+
+def play(path):
+    player = ReplayPlayer(path)
+    game = LoggingGame()
+    while not player.finished:
+        player.step(game)
+    return player, game.log
+
+
+@pytest.mark.parametrize("value", [0, 1, 127, 128, 300, 16383, 16384, 2**40])
+def test_varint_round_trip(value):
+    out = bytearray()
+    replay._write_varint(out, value)
+    assert replay._read_varint(io.BytesIO(bytes(out) + b"\xff")) == value
+
+
+def test_truncated_varint_reads_as_end():
+    assert replay._read_varint(io.BytesIO(b"\x80")) is None
+
+
+def test_mask_keys_round_trip():
+    for mask in range(256):
+        assert key_mask(mask_keys(mask)) == mask
+
+
+def test_recording_replays_the_same_ticks(tmp_path, monkeypatch):
+    monkeypatch.setattr(replay, "FLUSH_TICKS", 7)  # Flush mid-run as well
+    path = str(tmp_path / "games" / "game.ocr")
+    recorder = InputRecorder(path, seed=1234)
+    recorder.restart_countdown()  # Before the first tick: not recorded
+    masks = [0] * 5 + [1] * 20 + [0b1001] * 3 + [0] + [255] * 200
+    expected = []
+    for i, mask in enumerate(masks):
+        recorder.tick(mask_keys(mask))
+        expected.append(mask)
+        if i == 40:
+            recorder.restart_countdown()
+            expected.append("restart")
+    recorder.close()
+
+    player, log = play(path)
+    assert player.seed == 1234
+    assert log == expected
+
+
+def test_runs_are_stored_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(replay, "FLUSH_TICKS", 10_000)  # Each flush ends a run
+    path = str(tmp_path / "game.ocr")
+    recorder = InputRecorder(path, seed=1)
+    for _ in range(1000):
+        recorder.tick(mask_keys(3))
+    recorder.close()
+    # Header, then a two-byte varint count and the mask
+    assert (tmp_path / "game.ocr").stat().st_size == replay.REPLAY_HEADER.size + 3
+
+
+def test_unplayed_game_leaves_no_file(tmp_path):
+    path = tmp_path / "game.ocr"
+    recorder = InputRecorder(str(path), seed=1)
+    recorder.restart_countdown()
+    recorder.close()
+    assert not path.exists()
+
+
+def test_recording_cut_short_replays_what_was_flushed(tmp_path):
+    path = str(tmp_path / "game.ocr")
+    recorder = InputRecorder(path, seed=1)
+    for mask in (1, 1, 2):
+        recorder.tick(mask_keys(mask))
+    recorder.flush()
+    with open(path, "ab") as f:
+        f.write(b"\x85")  # Start of a record that never got finished
+    assert play(path)[1] == [1, 1, 2]
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "game.ocr"
+    path.write_bytes(b"OC")
+    with pytest.raises(ValueError, match="not a replay file"):
+        ReplayPlayer(str(path))
+    path.write_bytes(replay.REPLAY_HEADER.pack(b"OCRP", replay.REPLAY_VERSION + 1,
+                                               replay.TICK_RATE, 0, b"", 0))
+    with pytest.raises(ValueError, match="version"):
+        ReplayPlayer(str(path))
+
+
+def fish_image():
+    image = pygame.Surface((TILE_SIZE + 20, TILE_SIZE + 20), pygame.SRCALPHA)
+    image.fill((255, 0, 0))
+    return image
+
+
+def record(path, seed, difficulty="normal", pack=None):
+    game = Game(fish_image(), fish_image(), rng=random.Random(seed), prefetch=False,
+                pack=pack, difficulty=difficulty)
+    recorder = replay.open_recorder(game, seed, directory=str(path))
+    recorder.tick(mask_keys(1))
+    recorder.close()
+    return recorder.path
+
+
+def replay_game(path, difficulty="normal", pack=None):
+    return ReplayPlayer(path).new_game(fish_image(), fish_image(), pack=pack,
+                                       difficulty=difficulty)
+
+
+def test_level_source_is_recorded(tmp_path):
+    path = record(tmp_path, 5, "hard")
+    assert ReplayPlayer(path).source == ("hard", 0)
+    assert replay_game(path, "hard").difficulty == "hard"
+
+
+def test_other_difficulty_is_refused(tmp_path):
+    path = record(tmp_path, 5, "hard")
+    with pytest.raises(ValueError, match="difficulty 'hard'"):
+        replay_game(path, "easy")
+
+
+def test_level_pack_game_must_match(tmp_path):
+    pack_path = str(tmp_path / "a.ocl")
+    write_pack(pack_path, [generate_game(seed) for seed in range(3)])
+    other_path = str(tmp_path / "b.ocl")
+    write_pack(other_path, [generate_game(seed) for seed in range(10, 13)])
+    pack = LevelPack(pack_path)
+    path = record(tmp_path, 7, pack=pack)
+
+    game = replay_game(path, "easy", pack)  # The difficulty doesn't matter with a pack
+    assert ReplayPlayer(path).source == ("", game.pack_game_id)
+    with pytest.raises(ValueError, match="level pack game"):
+        replay_game(path)
+    with pytest.raises(ValueError, match="level pack game"):
+        replay_game(path, pack=LevelPack(other_path))
+
+
+def test_custom_difficulty_cannot_be_recorded(tmp_path):
+    with pytest.raises(ValueError, match="named difficulties"):
+        InputRecorder(str(tmp_path / "game.ocr"), 1, {1: (1, 0)})
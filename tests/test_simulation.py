@@ -0,0 +1,70 @@
+import random
+
+import pygame
+import pytest
+
+from constants import ORANGE, TILE_SIZE
+from simulation import MAX_FRAME_TIME, SIM_DT, FixedTimestep, Game
+
+
+def fish_image():
+    image = pygame.Surface((TILE_SIZE + 20, TILE_SIZE + 20), pygame.SRCALPHA)
+    image.fill((255, 0, 0))
+    return image
+
+
+@pytest.fixture
+def game():
+    return Game(fish_image(), fish_image(), rng=random.Random(0), prefetch=False)
+
+
+def test_collecting_placed_trash_keeps_the_rock_under_it(game):
+    # Stage 2 has rocks; bench.py piles trash on top of them
+    game.next_stage()
+    rock = game.rocks[0].rect
+    trash = game.level.place_trash(ORANGE, rock.topleft)
+    game.level.collect(trash)
+    assert not game.placement.is_free(rock)
+
+
+def test_placed_trash_occupies_its_cells(game):
+    free = len(game.placement.free)
+    spot = game.find_free_spot()
+    game.placement.release(pygame.Rect(spot, (TILE_SIZE, TILE_SIZE)))
+    trash = game.level.place_trash(ORANGE, spot)
+    assert len(game.placement.free) == free - 1
+    game.level.collect(trash)
+    assert len(game.placement.free) == free
+
+
+def test_fixed_timestep_runs_whole_steps():
+    # Steps of 1/4s keep the float arithmetic exact
+    timestep = FixedTimestep(dt=0.25, max_frame_time=10)
+    assert timestep.advance(0.75, lambda: False) == 3
+    assert timestep.accumulator == 0
+
+
+def test_fixed_timestep_carries_the_leftover():
+    timestep = FixedTimestep(dt=0.25, max_frame_time=10)
+    assert timestep.advance(0.375, lambda: False) == 1
+    assert timestep.accumulator == 0.125
+    assert timestep.advance(0.125, lambda: False) == 1
+    assert timestep.accumulator == 0
+
+
+def test_fixed_timestep_clamps_long_frames():
+    # A stall (window drag, breakpoint) doesn't replay seconds of simulation
+    timestep = FixedTimestep()
+    assert timestep.advance(5.0, lambda: False) == round(MAX_FRAME_TIME / SIM_DT)
+
+
+def test_fixed_timestep_stops_when_a_step_ends_the_game():
+    timestep = FixedTimestep(dt=0.25, max_frame_time=10)
+    steps = []
+
+    def step():
+        steps.append(None)
+        return len(steps) == 2
+
+    assert timestep.advance(1.5, step) == 2
+    assert timestep.accumulator == 0
@@ -0,0 +1,65 @@
+import random
+
+import pygame
+
+from spatial import SpatialHash
+
+
+def brute_force(items, rect):
+    return {item for item, item_rect in items.items() if item_rect.colliderect(rect)}
+
+
+def test_query_finds_items_in_covered_cells():
+    grid = SpatialHash(40)
+    grid.insert("a", pygame.Rect(0, 0, 40, 40))
+    grid.insert("b", pygame.Rect(100, 100, 40, 40))
+    assert grid.query(pygame.Rect(10, 10, 5, 5)) == ["a"]
+    assert grid.query(pygame.Rect(300, 300, 5, 5)) == []
+
+
+def test_item_spanning_cells_is_reported_once():
+    grid = SpatialHash(40)
+    grid.insert("wide", pygame.Rect(20, 20, 100, 100))
+    assert grid.query(pygame.Rect(0, 0, 200, 200)) == ["wide"]
+
+
+def test_rect_edges_are_exclusive():
+    grid = SpatialHash(40)
+    grid.insert("a", pygame.Rect(0, 0, 40, 40))
+    # right and bottom are one past the last pixel, so the next cell is untouched
+    assert grid.query(pygame.Rect(40, 40, 40, 40)) == []
+
+
+def test_insert_again_moves_item():
+    grid = SpatialHash(40)
+    grid.insert("a", pygame.Rect(0, 0, 40, 40))
+    grid.insert("a", pygame.Rect(200, 200, 40, 40))
+    assert len(grid) == 1
+    assert grid.query(pygame.Rect(0, 0, 40, 40)) == []
+    assert grid.query(pygame.Rect(200, 200, 40, 40)) == ["a"]
+
+
+def test_remove_drops_empty_buckets():
+    grid = SpatialHash(40)
+    grid.insert("a", pygame.Rect(0, 0, 80, 80))
+    grid.remove("a")
+    grid.remove("a")  # Removing twice is harmless
+    assert "a" not in grid
+    assert grid.cells == {}
+
+
+def test_query_is_a_superset_of_overlaps():
+    rng = random.Random(1)
+    grid = SpatialHash(40)
+    items = {}
+    for i in range(200):
+        rect = pygame.Rect(rng.randrange(800), rng.randrange(600),
+                           rng.randrange(1, 90), rng.randrange(1, 90))
+        items[i] = rect
+        grid.insert(i, rect)
+    for _ in range(100):
+        rect = pygame.Rect(rng.randrange(800), rng.randrange(600),
+                           rng.randrange(1, 120), rng.randrange(1, 120))
+        found = grid.query(rect)
+        assert len(found) == len(set(found))
+        assert brute_force(items, rect) <= set(found)
@@ -0,0 +1,58 @@
+import pygame
+
+from constants import ORANGE, TEAL
+from trash_store import TrashStore
+
+
+def make_store(capacity=32):
+    return TrashStore([ORANGE, TEAL], 40, capacity=capacity)
+
+
+def test_counts_follow_adds_and_collects():
+    store = make_store()
+    a = store.add(0, 0, ORANGE)
+    store.add(40, 0, ORANGE)
+    store.add(80, 0, TEAL)
+    assert (store.total(ORANGE), store.total(TEAL)) == (2, 1)
+    store.collect(a)
+    store.collect(a)  # Collecting twice counts once
+    assert store.collected_count(ORANGE) == 1
+    assert store.collected_count(TEAL) == 0
+    assert store.remaining == 2
+    assert list(store.uncollected()) == [1, 2]
+
+
+def test_colors_match_as_tuples():
+    store = make_store()
+    store.add(0, 0, list(TEAL))
+    assert store.total(pygame.Color(*TEAL)[:3]) == 1
+
+
+def test_grows_past_capacity():
+    store = make_store(capacity=2)
+    for i in range(5):
+        store.add(i * 40, 0, ORANGE if i % 2 else TEAL)
+    store.collect(4)
+    assert store.count == 5
+    assert list(store.x[:5]) == [0, 40, 80, 120, 160]
+    assert list(store.uncollected()) == [0, 1, 2, 3]
+    assert store.total(TEAL) == 3
+
+
+def test_overlapping_skips_collected_and_touching_tiles():
+    store = make_store()
+    store.add(0, 0, ORANGE)
+    store.add(40, 0, ORANGE)  # Touches the query rect's right edge only
+    store.add(10, 10, TEAL)
+    store.collect(2)
+    assert list(store.overlapping(pygame.Rect(20, 20, 20, 20))) == [0]
+
+
+def test_overlapping_limited_to_indices():
+    store = make_store()
+    for x in (0, 10, 20):
+        store.add(x, 0, ORANGE)
+    rect = pygame.Rect(0, 0, 60, 60)
+    assert list(store.overlapping(rect)) == [0, 1, 2]
+    assert list(store.overlapping(rect, [2, 0])) == [2, 0]
+    assert list(store.overlapping(rect, [])) == []
@@ -0,0 +1,53 @@
+from collections import OrderedDict
+
+import pygame
+
+# Maximum number of rendered text surfaces kept around
+TEXT_CACHE_SIZE = 256
+
+# Fonts loaded once per size
+_fonts = {}
+
+# Rendered surfaces keyed on (text, size, color, antialias), least recently used first
+_rendered = OrderedDict()
+
+
+def get_font(size):
+    font = _fonts.get(size)
+    if font is None:
+        font = pygame.font.Font(None, size)
+        _fonts[size] = font
+    return font
+
+
+def render_text(text, size, color, antialias=True):
+    # Returned surfaces are shared, so callers must only blit them
+    key = (text, size, tuple(color), antialias)
+    surface = _rendered.get(key)
+    if surface is not None:
+        _rendered.move_to_end(key)
+        return surface
+
+    surface = get_font(size).render(text, antialias, color)
+    _rendered[key] = surface
+    if len(_rendered) > TEXT_CACHE_SIZE:
+        _rendered.popitem(last=False)
+    return surface
+
+
+# Label whose content changes over time (timer, HUD counters).
+# Keeps only its last surface and re-renders when the displayed string changes,
+# so it doesn't flood the shared cache with one-off strings.
+class TextLabel:
+    def __init__(self, size, color, antialias=True):
+        self.size = size
+        self.color = color
+        self.antialias = antialias
+        self.text = None
+        self.surface = None
+
+    def render(self, text):
+        if text != self.text or self.surface is None:
+            self.text = text
+            self.surface = get_font(self.size).render(text, self.antialias, self.color)
+        return self.surface
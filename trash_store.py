@@ -0,0 +1,71 @@
+import numpy as np
+
+
+# Struct-of-arrays store for a level's trash.
+# Positions, color ids and collected flags live in NumPy arrays indexed by
+# trash id, and per-color totals and collected counts are kept up to date as
+# trash is added and collected, so the HUD and completion checks never scan.
+class TrashStore:
+    def __init__(self, colors, size, capacity=32):
+        self.colors = [tuple(c) for c in colors]
+        self.color_ids = {c: i for i, c in enumerate(self.colors)}
+        self.size = size
+        self.count = 0
+        self.x = np.zeros(capacity, dtype=np.int32)
+        self.y = np.zeros(capacity, dtype=np.int32)
+        self.color = np.zeros(capacity, dtype=np.int8)
+        self.collected = np.zeros(capacity, dtype=bool)
+        self.totals = [0] * len(self.colors)
+        self.collected_counts = [0] * len(self.colors)
+
+    def _grow(self):
+        capacity = len(self.x) * 2
+        for name in ("x", "y", "color", "collected"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def add(self, x, y, color):
+        if self.count == len(self.x):
+            self._grow()
+        index = self.count
+        color_id = self.color_ids[tuple(color)]
+        self.x[index] = x
+        self.y[index] = y
+        self.color[index] = color_id
+        self.totals[color_id] += 1
+        self.count += 1
+        return index
+
+    def collect(self, index):
+        if self.collected[index]:
+            return
+        self.collected[index] = True
+        self.collected_counts[self.color[index]] += 1
+
+    def total(self, color):
+        return self.totals[self.color_ids[tuple(color)]]
+
+    def collected_count(self, color):
+        return self.collected_counts[self.color_ids[tuple(color)]]
+
+    @property
+    def remaining(self):
+        return sum(self.totals) - sum(self.collected_counts)
+
+    def uncollected(self):
+        return np.flatnonzero(~self.collected[:self.count])
+
+    def overlapping(self, rect, indices=None):
+        # Ids of uncollected trash whose tile overlaps rect, optionally limited to
+        # `indices`
+        if indices is None:
+            ids = np.arange(self.count)
+        else:
+            ids = np.asarray(indices, dtype=np.intp)
+        x = self.x[ids]
+        y = self.y[ids]
+        hit = ((x < rect.right) & (x + self.size > rect.left) &
+               (y < rect.bottom) & (y + self.size > rect.top) & ~self.collected[ids])
+        return ids[hit]